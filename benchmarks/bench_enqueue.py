@@ -0,0 +1,107 @@
+"""
+mq_Producer 入队路径的微基准
+
+对比两种单条消息入队方式的延迟 p50/p99：
+- baseline：每个请求 Redis.from_pool 建客户端，LPUSH 后再 LLEN，最后 aclose（两次往返）
+- shared：lifespan 中创建的应用级共享客户端 + enqueue_messages（一次往返）
+
+用法（在仓库根目录执行）:
+    python benchmarks/bench_enqueue.py --redis-url redis://127.0.0.1:6379/15
+    python benchmarks/bench_enqueue.py    # 不指定时使用 fakeredis，只反映客户端开销，没有网络往返
+
+基准使用单独的队列键，结束后删除，不影响正在运行的队列。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_KEY = "bench:autoText"
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _make_pool(redis_url):
+    from redis import asyncio as aioredis
+    if redis_url:
+        return aioredis.ConnectionPool.from_url(redis_url)
+    import fakeredis
+    from fakeredis.aioredis import FakeConnection
+    return aioredis.ConnectionPool(connection_class=FakeConnection, server=fakeredis.FakeServer())
+
+
+async def _bench_baseline(pool, value, n):
+    from redis import asyncio as aioredis
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        redis = aioredis.Redis.from_pool(pool)
+        await redis.lpush(BENCH_KEY, value)
+        await redis.llen(BENCH_KEY)
+        await redis.aclose()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _bench_shared(redis, value, n):
+    from mq_Producer import enqueue_messages
+    samples = []
+    for _ in range(n):
+        started = time.perf_counter()
+        await enqueue_messages(redis, [value])
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def main(args):
+    from redis import asyncio as aioredis
+
+    value = json.dumps({"receiver": "测试群", "msg": "x" * args.size}, ensure_ascii=False)
+    results = {}
+
+    # from_pool 创建的客户端 aclose 时会一并断开连接池，下个请求重新建连，与基线行为一致
+    pool = _make_pool(args.redis_url)
+    await _bench_baseline(pool, value, args.warmup)
+    results["baseline"] = await _bench_baseline(pool, value, args.n)
+
+    redis = aioredis.Redis(connection_pool=_make_pool(args.redis_url))
+    try:
+        await _bench_shared(redis, value, args.warmup)
+        results["shared"] = await _bench_shared(redis, value, args.n)
+        await redis.delete(BENCH_KEY, f"{BENCH_KEY}:stream")
+    finally:
+        await redis.aclose()
+
+    target = args.redis_url or "fakeredis"
+    print(f"目标: {target}  传输: {os.environ['REDIS_TRANSPORT']}  请求数: {args.n}  消息长度: {len(value)}")
+    for name, samples in results.items():
+        print(
+            f"{name:>8}: p50 {_percentile(samples, 50) * 1e6:8.1f}us  "
+            f"p99 {_percentile(samples, 99) * 1e6:8.1f}us  "
+            f"总计 {sum(samples):.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="mq_Producer 入队延迟微基准")
+    parser.add_argument("--redis-url", default=None, help="本地 redis-server 地址，不指定时使用 fakeredis")
+    parser.add_argument("--transport", choices=("list", "stream"), default="list", help="shared 路径使用的传输方式")
+    parser.add_argument("-n", type=int, default=2000, help="每种方式的请求数")
+    parser.add_argument("--warmup", type=int, default=200, help="预热请求数")
+    parser.add_argument("--size", type=int, default=64, help="消息文字长度")
+    args = parser.parse_args()
+
+    # mq_Producer 在导入时读取配置，先把基准用的键和传输方式写入环境变量
+    os.environ["REDIS_QUEUE_KEY"] = BENCH_KEY
+    os.environ["REDIS_STREAM_KEY"] = f"{BENCH_KEY}:stream"
+    os.environ["REDIS_TRANSPORT"] = args.transport
+    asyncio.run(main(args))
@@ -0,0 +1,68 @@
+"""
+新消息红点判断的微基准
+
+用合成图片对比逐像素判断（未安装 numpy 时的实现）与 numpy 向量化判断的耗时，
+不需要截屏，可以在 Linux 上运行。
+
+用法（在仓库根目录执行）:
+    python benchmarks/bench_red_pixel.py
+    python benchmarks/bench_red_pixel.py -n 2000 --sizes 36 72 200
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _load_pixels():
+    # 绕过 wxauto/__init__.py（依赖 comtypes/win32），直接加载不依赖 Windows 的模块
+    spec = importlib.util.spec_from_file_location("_bench_pixels", os.path.join(ROOT, "wxauto", "pixels.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _image(size, red, seed=0):
+    """灰色背景加随机噪点，red=True 时在右上角放一个红点；没有红点是逐像素判断的最坏情况"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (size, size), (235, 235, 235))
+    for _ in range(size * size // 4):
+        v = rng.randrange(256)
+        img.putpixel((rng.randrange(size), rng.randrange(size)), (v, min(255, v + 10), v))
+    if red:
+        img.putpixel((size - 3, 2), (250, 81, 81))
+    return img
+
+
+def _time(func, img, n):
+    started = time.perf_counter()
+    for _ in range(n):
+        func(img)
+    return (time.perf_counter() - started) / n
+
+
+def main(args):
+    pixels = _load_pixels()
+    if pixels.np is None:
+        raise SystemExit("未安装 numpy，无法对比向量化实现")
+    print(f"{'尺寸':>8} {'红点':>4} {'逐像素(us)':>12} {'numpy(us)':>12} {'加速':>8}")
+    for size in args.sizes:
+        for red in (False, True):
+            img = _image(size, red)
+            assert pixels.HasRedPixel(img) == pixels._has_red_pixel_loop(img)
+            loop = _time(pixels._has_red_pixel_loop, img, args.n)
+            vectorised = _time(pixels.HasRedPixel, img, args.n)
+            print(f"{size:>4}x{size:<3} {'有' if red else '无':>4} {loop * 1e6:12.1f} {vectorised * 1e6:12.1f} {loop / vectorised:7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="红点判断微基准")
+    parser.add_argument("-n", type=int, default=500, help="每种图片的判断次数")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[36, 72, 200], help="正方形图片边长（像素）")
+    main(parser.parse_args())
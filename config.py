@@ -36,6 +36,15 @@ WX_EXCLUDED_CHATS = _parse_list(
     ["文件传输助手", "微信团队", "微信支付"]
 )
 
+# 新消息检测方式：poll（每秒轮询）或 event（UIA 结构变化事件驱动，失败时自动退回轮询）
+WX_LISTEN_MODE = os.getenv('WX_LISTEN_MODE', 'poll').lower()
+# event 模式下无事件时的兜底轮询间隔（秒）
+WX_EVENT_FALLBACK_INTERVAL = float(os.getenv('WX_EVENT_FALLBACK_INTERVAL', '5'))
+# 并行轮询监听窗口的线程数，0 表示在监听线程中逐个轮询
+WX_LISTEN_WORKERS = int(os.getenv('WX_LISTEN_WORKERS', '0'))
+# 并行轮询时每轮最长等待秒数，超时的窗口结果留到下一轮
+WX_LISTEN_POLL_TIMEOUT = float(os.getenv('WX_LISTEN_POLL_TIMEOUT', '5'))
+
 # MaiBot API 配置
 MAIBOT_API_URL = os.getenv('MAIBOT_API_URL', 'http://192.168.8.124:8000/api/message')
 
@@ -43,6 +52,56 @@ MAIBOT_API_URL = os.getenv('MAIBOT_API_URL', 'http://192.168.8.124:8000/api/mess
 REDIS_URL = os.getenv('REDIS_URL', 'redis://192.168.8.124:6379')
 REDIS_QUEUE_KEY = os.getenv('REDIS_QUEUE_KEY', 'autoText')
 
+# 队列传输方式：list（LPUSH/BRPOP，至多一次）或 stream（XADD/XREADGROUP/XACK，至少一次）
+REDIS_TRANSPORT = os.getenv('REDIS_TRANSPORT', 'list').lower()
+# stream 模式配置
+REDIS_STREAM_KEY = os.getenv('REDIS_STREAM_KEY', f'{REDIS_QUEUE_KEY}:stream')
+REDIS_STREAM_GROUP = os.getenv('REDIS_STREAM_GROUP', 'wemai')
+REDIS_STREAM_CONSUMER = os.getenv('REDIS_STREAM_CONSUMER', 'wx-sender')
+# 未确认消息空闲超过该时间（毫秒）后会被 XAUTOCLAIM 重新认领
+REDIS_STREAM_MIN_IDLE_MS = int(os.getenv('REDIS_STREAM_MIN_IDLE_MS', '60000'))
+# 单条消息最多投递次数，超过后确认并丢弃，避免毒消息反复重试
+REDIS_STREAM_MAX_DELIVERIES = int(os.getenv('REDIS_STREAM_MAX_DELIVERIES', '3'))
+# stream 最大长度（近似裁剪），0 表示不裁剪
+# 裁剪不区分消息是否已确认，消费者落后或停机时会删掉尚未发送的积压，默认不裁剪
+REDIS_STREAM_MAXLEN = int(os.getenv('REDIS_STREAM_MAXLEN', '0'))
+
+# 消息队列消费者配置
+# BRPOP 阻塞等待超时（秒），超时后重新进入等待，便于响应取消
+REDIS_BRPOP_TIMEOUT = int(os.getenv('REDIS_BRPOP_TIMEOUT', '5'))
+# 被唤醒后单次流水线最多取出的消息条数
+REDIS_CONSUMER_BATCH_SIZE = int(os.getenv('REDIS_CONSUMER_BATCH_SIZE', '50'))
+
+# 发送调度配置
+# 其他聊天有待发消息时，当前聊天最多连续发送的条数（防止饿死），<=0 表示不限制
+SEND_AFFINITY_MAX_STREAK = int(os.getenv('SEND_AFFINITY_MAX_STREAK', '20'))
+# 同一接收者相邻文字段的合并窗口（毫秒），0 表示不合并
+SEND_COALESCE_WINDOW_MS = int(os.getenv('SEND_COALESCE_WINDOW_MS', '0'))
+# 合并后单条文字消息的最大长度
+SEND_COALESCE_MAX_LENGTH = int(os.getenv('SEND_COALESCE_MAX_LENGTH', '500'))
+
+# 图片负载配置
+# 直接编码发送的图片大小上限（MB），0 表示不限制。编码时原图、base64 缓冲区和最终字符串
+# 同时驻留，峰值约为图片大小的 2.7 倍；超过上限的图片强制按预处理参数缩放，缩放后仍超限则不发送
+IMAGE_MAX_SOURCE_MB = int(os.getenv('IMAGE_MAX_SOURCE_MB', '10'))
+# 发送前是否预处理图片（限制尺寸、重新编码、去除元数据）
+IMAGE_PREPROCESS_ENABLED = _parse_bool(os.getenv('IMAGE_PREPROCESS_ENABLED'), False)
+# 预处理后图片长边的最大像素，0 表示不缩放
+IMAGE_MAX_EDGE = int(os.getenv('IMAGE_MAX_EDGE', '1280'))
+# 预处理输出格式：JPEG 或 WEBP
+IMAGE_OUTPUT_FORMAT = os.getenv('IMAGE_OUTPUT_FORMAT', 'JPEG').upper()
+# 预处理输出质量（1-100）
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+# 预处理线程数
+IMAGE_PREPROCESS_WORKERS = int(os.getenv('IMAGE_PREPROCESS_WORKERS', '2'))
+# 入站图片内容缓存上限（MB），字节完全相同的图片只预处理一次，0 表示不缓存；仅在启用预处理时生效
+# 缓存的是常驻内存的 base64 字符串，默认关闭，表情包重复较多时再按内存余量开启
+IMAGE_CACHE_MAX_MB = int(os.getenv('IMAGE_CACHE_MAX_MB', '0'))
+# MaiBot 发来的图片/表情包解码后的缓存目录，相同内容复用同一个文件
+OUTBOUND_MEDIA_CACHE_DIR = os.getenv('OUTBOUND_MEDIA_CACHE_DIR', os.path.join(os.getcwd(), 'media_cache'))
+# 出站媒体缓存上限（MB）
+OUTBOUND_MEDIA_CACHE_MAX_MB = int(os.getenv('OUTBOUND_MEDIA_CACHE_MAX_MB', '128'))
+
 # 消息队列生产者（FastAPI）配置
 API_HOST = os.getenv('API_HOST', '0.0.0.0')
 API_PORT = int(os.getenv('API_PORT', '8000'))
@@ -64,9 +123,12 @@ def print_config_info():
     logger.info(f"\u5fae信监听目标: {WX_TARGET_CHATS}")
     logger.info(f"\u76d1听所有聊天: {WX_LISTEN_ALL_IF_EMPTY}")
     logger.info(f"\u6392除的聊天: {WX_EXCLUDED_CHATS}")
+    logger.info(f"并行轮询线程数: {WX_LISTEN_WORKERS}")
     logger.info(f"MaiBot API URL: {MAIBOT_API_URL}")
     logger.info(f"Redis URL: {REDIS_URL}")
     logger.info(f"Redis 队列键: {REDIS_QUEUE_KEY}")
+    logger.info(f"Redis 传输方式: {REDIS_TRANSPORT}")
+    logger.info(f"Redis 消费批量: {REDIS_CONSUMER_BATCH_SIZE}")
     logger.info(f"API 监听地址: {API_HOST}:{API_PORT}")
     logger.info(f"\u65e5志级别: {LOG_LEVEL}")
     logger.info(f"\u5e73台标识: {PLATFORM_ID}")
@@ -70,6 +70,7 @@ def run_wx_listener(target_chats=None):
             while not stop_event.is_set():
                 time.sleep(1)
             listener.stop_listening()
+            processor.shutdown()
         
         # 启动停止检查线程
         stop_thread = threading.Thread(target=check_stop)
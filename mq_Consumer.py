@@ -1,9 +1,17 @@
 # mq_Consumer.py
 import time
+import asyncio
 import threading
 import traceback
 from queue import Queue, Empty
 from wxauto import WeChat
+from mq_Redis import pop_batch, decode_raw, StreamConsumer
+from mq_SendQueue import ReceiverAffinityQueue
+from config import (
+    REDIS_URL, REDIS_QUEUE_KEY, REDIS_BRPOP_TIMEOUT, REDIS_CONSUMER_BATCH_SIZE,
+    REDIS_TRANSPORT,
+)
+
 
 # ======================================================
 # 单线程微信发送器（核心）
@@ -34,7 +42,11 @@ class WxSendWorker(threading.Thread):
             del self.wx
         except Exception:
             pass
+        # 新实例不再处于任何聊天，下次发送需要重新 ChatWith
+        self.current_chat = None
         self._init_wx()
+        # 通知 stream 消费者重新认领未确认的消息
+        reclaim_requested.set()
 
     def run(self):
         print("[WxWorker] 发送线程已启动")
@@ -49,11 +61,25 @@ class WxSendWorker(threading.Thread):
             content = task["content"]
             retry = task.get("retry", 1)
 
+            on_start = task.get("on_start")
+            if on_start:
+                try:
+                    on_start()
+                except Exception:
+                    traceback.print_exc()
+
             success = self._send_with_retry(who, content, retry)
 
             if not success:
                 print(f"[WxWorker] ⛔ 消息最终发送失败 -> {who}")
 
+            on_done = task.get("on_done")
+            if on_done:
+                try:
+                    on_done(success)
+                except Exception:
+                    traceback.print_exc()
+
             self.queue.task_done()
 
     def _send_with_retry(self, who, content, retry):
@@ -89,7 +115,10 @@ class WxSendWorker(threading.Thread):
 # 全局发送队列（缓冲高峰消息）
 # ======================================================
 
-send_queue = Queue(maxsize=5000)
+send_queue = ReceiverAffinityQueue(maxsize=5000)
+
+# WeChat 实例重建后置位，stream 消费者据此立即执行一次 XAUTOCLAIM
+reclaim_requested = threading.Event()
 
 # 启动单线程发送 worker
 wx_worker = WxSendWorker(send_queue)
@@ -100,52 +129,113 @@ wx_worker.start()
 # 对外接口：消息入队
 # ======================================================
 
-def consume_msg(msg: dict):
+def consume_msg(msg: dict, on_done=None, on_start=None):
     """
     msg 示例:
     {
         "from": "张三",
         "content": "你好"
     }
+    也兼容 mq_Producer 写入 Redis 的格式:
+    {
+        "receiver": "张三",
+        "msg": "你好"
+    }
+
+    on_done: 可选回调，发送线程处理完该消息后以 on_done(success) 调用
+    on_start: 可选回调，发送线程开始发送该消息前以 on_start() 调用
+
+    返回是否成功入队
     """
-    who = msg.get("from")
-    content = msg.get("content")
+    who = msg.get("from") or msg.get("receiver")
+    content = msg.get("content") or msg.get("msg")
 
     if not who or not content:
         print("[consume_msg] ⚠️ 非法消息:", msg)
-        return
+        return False
 
     task = {
         "who": who,
         "content": content,
         "retry": 1
     }
+    if on_done:
+        task["on_done"] = on_done
+    if on_start:
+        task["on_start"] = on_start
 
     try:
         send_queue.put(task, timeout=1)
         print(f"[consume_msg] ➕ 已入队 -> {who} | 队列长度: {send_queue.qsize()}")
+        return True
     except Exception:
         print("[consume_msg] 🚨 发送队列已满，消息丢弃:", task)
+        return False
+
+
+def _enqueue_batch(raws):
+    """将一批原始消息解析后放入发送队列（在线程池中执行，避免阻塞事件循环）"""
+    for raw in raws:
+        msg = decode_raw(raw)
+        if msg is not None:
+            consume_msg(msg)
 
 
 # ======================================================
 # main()
 # ======================================================
 
-def main(redis_client=None):
+async def main(redis_client=None, key=REDIS_QUEUE_KEY, batch_size=REDIS_CONSUMER_BATCH_SIZE,
+               block_timeout=REDIS_BRPOP_TIMEOUT):
+    """
+    消费 mq_Producer 写入 Redis 的消息并交给 WxSendWorker
+
+    使用 BRPOP 阻塞等待，不再轮询 sleep；被唤醒后通过一次流水线取出
+    队列中最多 batch_size 条积压消息，突发回复时每批只需一次往返。
+
+    Args:
+        redis_client: 可选，外部传入的 redis.asyncio 客户端（测试时可传入 fakeredis）
+        key (str): 队列键名
+        batch_size (int): 单批最多取出的消息条数
+        block_timeout (int): BRPOP 阻塞超时（秒）
+
+    REDIS_TRANSPORT=stream 时改用 StreamConsumer（XREADGROUP + XACK）。
+    """
     print("[mq_Consumer] consumer main started")
 
-    while True:
+    own_client = redis_client is None
+    if own_client:
+        from redis import asyncio as aioredis
+        redis_client = aioredis.from_url(REDIS_URL)
+
+    if REDIS_TRANSPORT == "stream":
         try:
-            # ⚠️ 保留你原来的 Redis / MQ 消费逻辑
-            # 示例（伪代码）：
-            #
-            # msg = redis_client.brpop("queue_name")
-            # consume_msg(parsed_msg)
-            #
-            time.sleep(1)
-
-        except Exception as e:
-            print("[mq_Consumer] 主循环异常:", e)
-            traceback.print_exc()
-            time.sleep(2)
+            await StreamConsumer(
+                redis_client, consume_msg, reclaim_requested, batch_size=batch_size, block_timeout=block_timeout
+            ).run()
+        finally:
+            if own_client:
+                await redis_client.aclose()
+        return
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                batch = await pop_batch(redis_client, key, batch_size, block_timeout)
+                if not batch:
+                    continue
+
+                print(f"[mq_Consumer] 📥 取出 {len(batch)} 条消息")
+
+                await loop.run_in_executor(None, _enqueue_batch, batch)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("[mq_Consumer] 主循环异常:", e)
+                traceback.print_exc()
+                await asyncio.sleep(2)
+    finally:
+        if own_client:
+            await redis_client.aclose()
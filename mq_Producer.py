@@ -8,7 +8,11 @@ from redis import asyncio as aioredis
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import logging
 
-from config import REDIS_URL, REDIS_QUEUE_KEY, API_HOST, API_PORT, LOG_LEVEL, LOG_FORMAT, LOG_DATE_FORMAT
+from config import (
+    REDIS_URL, REDIS_QUEUE_KEY, API_HOST, API_PORT, LOG_LEVEL, LOG_FORMAT, LOG_DATE_FORMAT,
+    REDIS_TRANSPORT, REDIS_STREAM_KEY, REDIS_STREAM_GROUP, REDIS_STREAM_MAXLEN,
+)
+from redis.exceptions import ResponseError
 
 # 配置日志
 logging.basicConfig(
@@ -24,16 +28,51 @@ logger = logging.getLogger(__name__)
 # 使用配置文件中的Redis连接信息
 pool = aioredis.ConnectionPool.from_url(REDIS_URL)
 
+async def ensure_stream_group(redis):
+    """创建 stream 及消费组（已存在时忽略）"""
+    try:
+        await redis.xgroup_create(REDIS_STREAM_KEY, REDIS_STREAM_GROUP, id='0', mkstream=True)
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+async def enqueue_messages(redis, values):
+    """
+    按配置的传输方式把已序列化的消息写入 Redis，一次往返完成
+    
+    Args:
+        redis: 共享的 Redis 客户端
+        values (list): JSON 字符串列表，按接收顺序排列
+    
+    Returns:
+        list 模式返回写入后的队列长度，stream 模式返回最后一条消息的 ID
+    """
+    if REDIS_TRANSPORT == 'stream':
+        maxlen = REDIS_STREAM_MAXLEN or None
+        async with redis.pipeline(transaction=False) as pipe:
+            for value in values:
+                pipe.xadd(REDIS_STREAM_KEY, {'data': value}, maxlen=maxlen, approximate=True)
+            ids = await pipe.execute()
+        last_id = ids[-1]
+        return last_id.decode() if isinstance(last_id, bytes) else last_id
+    return await redis.lpush(REDIS_QUEUE_KEY, *values)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动前的操作
-    redis = aioredis.Redis.from_pool(pool)
-    await redis.delete(REDIS_QUEUE_KEY)
-    await redis.aclose()
+    # 启动前的操作：创建应用级共享的 Redis 客户端，请求处理中直接复用
+    app.state.redis = aioredis.Redis(connection_pool=pool)
+    if REDIS_TRANSPORT == 'stream':
+        # stream 模式保留积压，只确保消费组存在
+        await ensure_stream_group(app.state.redis)
+    else:
+        await app.state.redis.delete(REDIS_QUEUE_KEY)
     
     yield
     
     # 关闭时的操作
+    await app.state.redis.aclose()
     await pool.aclose()
 
 
@@ -52,6 +91,56 @@ async def request_validation_error(request: Request, exc: RequestValidationError
     return JSONResponse(status_code=200, content={"code": 0, "msg": "请求失败"})
 
 
+def _build_redis_message(data):
+    """
+    校验 MaiBot 消息并转换为 Redis 队列格式
+    
+    Args:
+        data (dict): MaiBot 消息体
+    
+    Returns:
+        tuple: (redis_message, error)，校验失败时 redis_message 为 None
+    """
+    if not isinstance(data, dict):
+        return None, "消息格式不正确"
+    
+    # 提取消息信息
+    message_info = data.get('message_info', {})
+    message_segment = data.get('message_segment', {})
+    
+    # 如果没有消息信息或消息段，返回错误
+    if not message_info or not message_segment:
+        return None, "消息格式不正确"
+    
+    # 提取接收者信息
+    user_info = message_info.get('user_info', {})
+    group_info = message_info.get('group_info', {})
+    
+    # 提取消息内容
+    msg_type = message_segment.get('type')
+    msg_data = message_segment.get('data')
+    
+    if not msg_data or msg_type != 'text':
+        return None, "不支持的消息类型或消息内容为空"
+    
+    # 确定接收者
+    # 优先使用群名称，如果有群信息
+    if group_info and group_info.get('group_name'):
+        receiver = group_info.get('group_name')
+    # 如果没有群信息，使用用户昵称
+    elif user_info and user_info.get('user_nickname'):
+        receiver = user_info.get('user_nickname')
+    else:
+        return None, "无法确定消息接收者"
+    
+    # 构造符合 Redis 队列格式的消息
+    redis_message = {
+        "receiver": receiver,
+        "msg": msg_data
+    }
+    return redis_message, None
+
+
 # 接收来自 MaiBot 的消息
 @app.post("/api/message")
 async def process_maibot_message(request: Request):
@@ -60,51 +149,13 @@ async def process_maibot_message(request: Request):
         data = await request.json()
         logger.info(f"接收到 MaiBot 消息: {json.dumps(data, ensure_ascii=False)}")
         
-        # 提取消息信息
-        message_info = data.get('message_info', {})
-        message_segment = data.get('message_segment', {})
+        redis_message, error = _build_redis_message(data)
+        if error:
+            logger.error(error)
+            return {"code": 0, "msg": error}
         
-        # 如果没有消息信息或消息段，返回错误
-        if not message_info or not message_segment:
-            logger.error("消息格式不正确，缺少必要字段")
-            return {"code": 0, "msg": "消息格式不正确"}
-        
-        # 提取接收者信息
-        user_info = message_info.get('user_info', {})
-        group_info = message_info.get('group_info', {})
-        
-        # 提取消息内容
-        msg_type = message_segment.get('type')
-        msg_data = message_segment.get('data')
-        
-        if not msg_data or msg_type != 'text':
-            logger.error(f"不支持的消息类型或消息内容为空: {msg_type}")
-            return {"code": 0, "msg": "不支持的消息类型或消息内容为空"}
-        
-        # 确定接收者
-        # 优先使用群名称，如果有群信息
-        if group_info and group_info.get('group_name'):
-            receiver = group_info.get('group_name')
-        # 如果没有群信息，使用用户昵称
-        elif user_info and user_info.get('user_nickname'):
-            receiver = user_info.get('user_nickname')
-        else:
-            logger.error("无法确定消息接收者")
-            return {"code": 0, "msg": "无法确定消息接收者"}
-        
-        # 构造符合 Redis 队列格式的消息
-        redis_message = {
-            "receiver": receiver,
-            "msg": msg_data
-        }
-        
-        # 从应用状态获取连接池
-        redis = aioredis.Redis.from_pool(pool)
-        
-        # 推入到队列
-        await redis.lpush(REDIS_QUEUE_KEY, json.dumps(redis_message, ensure_ascii=False))
-        queue_size = await redis.llen(REDIS_QUEUE_KEY)
-        await redis.aclose()
+        # 推入到队列，一次往返完成（list 模式返回队列长度，stream 模式返回消息 ID）
+        queue_size = await enqueue_messages(request.app.state.redis, [json.dumps(redis_message, ensure_ascii=False)])
         
         logger.info(f"消息已添加到队列: {json.dumps(redis_message, ensure_ascii=False)}")
         return {"code": 1, "taskId": queue_size, "msg": "消息已添加到队列"}
@@ -117,6 +168,78 @@ async def process_maibot_message(request: Request):
         return {"code": 0, "msg": f"系统错误: {str(e)}"}
 
 
+def _parse_batch_body(body: bytes, content_type: str):
+    """
+    解析批量请求体，支持 JSON 数组、单个 JSON 对象和 NDJSON（每行一条 JSON）
+    
+    Returns:
+        list: 消息列表；NDJSON 中无法解析的行以 json.JSONDecodeError 实例占位
+    """
+    text = body.decode("utf-8")
+    stripped = text.lstrip()
+    if "ndjson" not in content_type and stripped.startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise json.JSONDecodeError("请求体不是数组", text, 0)
+        return items
+    if "ndjson" not in content_type and stripped.startswith("{"):
+        # 单个（可能跨多行的）JSON 对象按一条消息处理；解析失败说明是多行 NDJSON
+        try:
+            return [json.loads(text)]
+        except json.JSONDecodeError:
+            pass
+    
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            items.append(e)
+    return items
+
+
+# 批量接收来自 MaiBot 的消息（用于回放/故障恢复后的追赶）
+@app.post("/api/messages:batch")
+async def process_maibot_messages_batch(request: Request):
+    try:
+        body = await request.body()
+        items = _parse_batch_body(body, request.headers.get("content-type", ""))
+        
+        # 逐条校验，保留每条的处理结果
+        results = []
+        values = []
+        for index, data in enumerate(items):
+            if isinstance(data, json.JSONDecodeError):
+                results.append({"index": index, "code": 0, "msg": "无效的 JSON 格式"})
+                continue
+            if not isinstance(data, dict):
+                results.append({"index": index, "code": 0, "msg": "消息必须是 JSON 对象"})
+                continue
+            redis_message, error = _build_redis_message(data)
+            if error:
+                results.append({"index": index, "code": 0, "msg": error})
+                continue
+            values.append(json.dumps(redis_message, ensure_ascii=False))
+            results.append({"index": index, "code": 1, "msg": "消息已添加到队列"})
+        
+        if values:
+            # 一次往返写入全部消息
+            await enqueue_messages(request.app.state.redis, values)
+        
+        accepted = len(values)
+        logger.info(f"批量消息已添加到队列: {accepted}/{len(items)}")
+        return {"code": 1 if accepted else 0, "accepted": accepted, "total": len(items), "results": results}
+    
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        logger.error("解析批量 JSON 数据失败")
+        return {"code": 0, "msg": "无效的 JSON 格式"}
+    except Exception as e:
+        logger.error(f"处理批量 MaiBot 消息时发生错误: {str(e)}")
+        return {"code": 0, "msg": f"系统错误: {str(e)}"}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,287 @@
+# mq_Redis.py
+"""
+Redis 队列的读取操作：列表（BRPOP + 批量取出）和 Streams（消费组 + 显式确认）
+
+不依赖微信自动化，mq_Consumer 和测试（fakeredis）共用
+"""
+import json
+import time
+import asyncio
+import traceback
+from queue import Queue, Empty
+from config import (
+    REDIS_STREAM_KEY, REDIS_STREAM_GROUP, REDIS_STREAM_CONSUMER, REDIS_CONSUMER_BATCH_SIZE,
+    REDIS_BRPOP_TIMEOUT, REDIS_STREAM_MIN_IDLE_MS, REDIS_STREAM_MAX_DELIVERIES,
+)
+
+
+def decode_raw(raw):
+    """将 Redis 中取出的原始数据解析为 dict，失败返回 None"""
+    try:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        msg = json.loads(raw)
+    except Exception as e:
+        print(f"[mq_Consumer] ⚠️ 无法解析队列消息: {raw!r} ({e})")
+        return None
+    if not isinstance(msg, dict):
+        print(f"[mq_Consumer] ⚠️ 队列消息格式错误: {msg!r}")
+        return None
+    return msg
+
+
+async def drain_batch(redis_client, key, first, batch_size):
+    """
+    BRPOP 唤醒后，在一次流水线往返中再取出最多 batch_size-1 条积压消息
+
+    mq_Producer 使用 LPUSH 写入，队尾是最早的消息：
+    LRANGE key -n -1 取队尾 n 条，LTRIM 同时将其移除，MULTI 保证两者原子执行。
+
+    Args:
+        redis_client: redis.asyncio 客户端（也可以是 fakeredis 的异步客户端）
+        key (str): 队列键名
+        first: BRPOP 返回的第一条原始消息
+        batch_size (int): 单批最多处理的消息条数（包含 first）
+
+    Returns:
+        list: 按入队顺序排列的原始消息列表
+    """
+    batch = [first]
+    extra = batch_size - 1
+    if extra <= 0:
+        return batch
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.lrange(key, -extra, -1)
+        pipe.ltrim(key, 0, -extra - 1)
+        items, _ = await pipe.execute()
+
+    # LRANGE 返回从新到旧，反转后保持 FIFO
+    batch.extend(reversed(items))
+    return batch
+
+
+async def pop_batch(redis_client, key, batch_size, timeout):
+    """
+    BRPOP 阻塞等待第一条消息，随后用 drain_batch 取出积压
+
+    Args:
+        redis_client: redis.asyncio 客户端
+        key (str): 队列键名
+        batch_size (int): 单批最多取出的消息条数
+        timeout (int): BRPOP 阻塞超时（秒）
+
+    Returns:
+        list: 按入队顺序排列的原始消息列表，超时时为空列表
+    """
+    popped = await redis_client.brpop(key, timeout=timeout)
+    if not popped:
+        return []
+    _, first = popped
+    return await drain_batch(redis_client, key, first, batch_size)
+
+
+# ======================================================
+# Redis Streams 传输（消费组 + 显式确认）
+# ======================================================
+
+class StreamConsumer:
+    """
+    基于 XREADGROUP/XACK 的至少一次消费
+
+    - 消息发送成功后才 XACK；发送线程崩溃、进程退出或最终发送失败时消息留在
+      PEL（待确认列表）中，由 XAUTOCLAIM 重新认领
+    - 启动时先读取本消费者名下的历史未确认消息，再认领其他消费者的超时消息，
+      之后按 COUNT/BLOCK 批量读取新消息
+    - 确认在发送线程中登记，由事件循环在下一轮批量 XACK
+    - 发送次数由本类记录在 <key>:attempts 哈希中：发送线程真正开始发送前 HINCRBY，
+      达到 max_deliveries 的消息确认并丢弃。不使用 Redis 的 times_delivered，
+      因为还在发送队列里排队的消息被 XAUTOCLAIM 认领时也会累加，会把从未发送过的消息丢掉
+    """
+
+    def __init__(self, redis_client, submit, reclaim_event=None, key=REDIS_STREAM_KEY,
+                 group=REDIS_STREAM_GROUP, consumer=REDIS_STREAM_CONSUMER,
+                 batch_size=REDIS_CONSUMER_BATCH_SIZE, block_timeout=REDIS_BRPOP_TIMEOUT,
+                 min_idle_ms=REDIS_STREAM_MIN_IDLE_MS, max_deliveries=REDIS_STREAM_MAX_DELIVERIES):
+        """
+        Args:
+            redis_client: redis.asyncio 客户端（也可以是 fakeredis 的异步客户端）
+            submit: 交付消息的函数 submit(msg, on_start=..., on_done=...)，返回是否成功入队；
+                发送线程开始发送前调用 on_start()，处理完后调用 on_done(success)
+            reclaim_event (threading.Event, optional): 置位后下一轮立即执行 XAUTOCLAIM
+        """
+        self.redis = redis_client
+        self.submit = submit
+        self.reclaim_event = reclaim_event
+        self.key = key
+        self.attempts_key = f"{key}:attempts"
+        self.group = group
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block_ms = block_timeout * 1000
+        self.min_idle_ms = min_idle_ms
+        self.max_deliveries = max_deliveries
+        self.acks = Queue()        # 发送线程登记的待确认 ID
+        self.inflight = set()      # 已交给发送队列、尚未处理完的 ID
+        self.last_reclaim = 0.0
+        self.loop = None
+
+    async def ensure_group(self):
+        from redis.exceptions import ResponseError
+        try:
+            await self.redis.xgroup_create(self.key, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def _make_on_start(self, entry_id):
+        def on_start():
+            # 在发送线程中同步等待计数写入，发送过程中进程崩溃也不会漏记
+            future = asyncio.run_coroutine_threadsafe(
+                self.redis.hincrby(self.attempts_key, entry_id, 1), self.loop
+            )
+            try:
+                future.result(timeout=5)
+            except Exception as e:
+                print(f"[mq_Consumer] ⚠️ 记录发送次数失败: {entry_id} ({e})")
+        return on_start
+
+    def _make_on_done(self, entry_id):
+        def on_done(success):
+            self.inflight.discard(entry_id)
+            if success:
+                self.acks.put(entry_id)
+        return on_done
+
+    async def _attempt_counts(self, entries):
+        """
+        读取一批消息已经开始发送的次数
+
+        Returns:
+            dict: ID -> 发送次数
+        """
+        ids = [entry_id for entry_id, _ in entries]
+        counts = await self.redis.hmget(self.attempts_key, ids)
+        return {entry_id: int(count or 0) for entry_id, count in zip(ids, counts)}
+
+    def _dispatch(self, entries, counts=None):
+        """
+        把一批 (id, fields) 交给发送队列（在线程池中执行）
+
+        counts 为 _attempt_counts 的结果；XREADGROUP > 读到的新消息还没有发送过，不需要传
+        """
+        for entry_id, fields in entries:
+            if entry_id in self.inflight:
+                # 仍在发送队列中排队，XAUTOCLAIM 认领到它不代表发送失败
+                continue
+            attempts = counts.get(entry_id, 0) if counts else 0
+            if attempts >= self.max_deliveries:
+                print(f"[mq_Consumer] ⛔ 消息已发送 {attempts} 次仍未成功，确认并丢弃: {entry_id}")
+                self.acks.put(entry_id)
+                continue
+            msg = decode_raw(fields.get(b"data", fields.get("data")))
+            if msg is None:
+                self.acks.put(entry_id)
+                continue
+            self.inflight.add(entry_id)
+            if not self.submit(msg, on_start=self._make_on_start(entry_id), on_done=self._make_on_done(entry_id)):
+                # 入队失败，留在 PEL 中等待重新认领
+                self.inflight.discard(entry_id)
+
+    async def _flush_acks(self):
+        ids = []
+        while True:
+            try:
+                ids.append(self.acks.get_nowait())
+            except Empty:
+                break
+        if ids:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.xack(self.key, self.group, *ids)
+                pipe.hdel(self.attempts_key, *ids)
+                await pipe.execute()
+
+    async def _read(self, start_id, block=None):
+        resp = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.key: start_id},
+            count=self.batch_size, block=block,
+        )
+        if not resp:
+            return []
+        if isinstance(resp, dict):
+            return next(iter(resp.values()))[0]
+        return resp[0][1]
+
+    async def _redeliver(self, entries):
+        counts = await self._attempt_counts(entries)
+        await asyncio.get_running_loop().run_in_executor(None, self._dispatch, entries, counts)
+
+    async def reclaim(self):
+        """XAUTOCLAIM 认领空闲超时的未确认消息并重新投递"""
+        start = "0-0"
+        while True:
+            resp = await self.redis.xautoclaim(
+                self.key, self.group, self.consumer, self.min_idle_ms,
+                start_id=start, count=self.batch_size,
+            )
+            start, entries = resp[0], resp[1]
+            entries = [(i, f) for i, f in entries if f and i not in self.inflight]
+            if entries:
+                print(f"[mq_Consumer] ♻️ 重新认领 {len(entries)} 条未确认消息")
+                await self._redeliver(entries)
+            if start in (b"0-0", "0-0"):
+                break
+        self.last_reclaim = time.monotonic()
+
+    async def recover(self):
+        """启动时重新投递本消费者名下重启前未确认的消息，并认领其他消费者的超时消息"""
+        self.loop = asyncio.get_running_loop()
+        await self.ensure_group()
+
+        # 按 ID 分页读取
+        start = "0"
+        while True:
+            page = await self._read(start)
+            if not page:
+                break
+            start = page[-1][0]
+            for entry_id, fields in page:
+                if not fields:
+                    # 消息已被裁剪，只剩 PEL 记录
+                    self.acks.put(entry_id)
+            entries = [(i, f) for i, f in page if f]
+            if entries:
+                print(f"[mq_Consumer] ♻️ 恢复 {len(entries)} 条历史未确认消息")
+                await self._redeliver(entries)
+        await self._flush_acks()
+        await self.reclaim()
+
+    async def _read_new(self, block=None):
+        """按 COUNT/BLOCK 读取一批新消息并交给发送队列"""
+        entries = await self._read(">", block=block)
+        if entries:
+            print(f"[mq_Consumer] 📥 取出 {len(entries)} 条消息")
+            await asyncio.get_running_loop().run_in_executor(None, self._dispatch, entries)
+
+    async def run(self):
+        await self.recover()
+
+        while True:
+            try:
+                await self._flush_acks()
+
+                idle_due = time.monotonic() - self.last_reclaim > self.min_idle_ms / 1000
+                requested = self.reclaim_event is not None and self.reclaim_event.is_set()
+                if requested or idle_due:
+                    if requested:
+                        self.reclaim_event.clear()
+                    await self.reclaim()
+
+                await self._read_new(block=self.block_ms)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("[mq_Consumer] stream 主循环异常:", e)
+                traceback.print_exc()
+                await asyncio.sleep(2)
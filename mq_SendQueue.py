@@ -0,0 +1,69 @@
+# mq_SendQueue.py
+"""
+微信发送任务队列：按接收者亲和调度，减少 ChatWith 切换
+
+不依赖微信自动化，mq_Consumer 和测试共用
+"""
+from collections import deque
+from queue import Queue
+from config import SEND_AFFINITY_MAX_STREAK
+
+
+class ReceiverAffinityQueue(Queue):
+    """
+    按接收者(who)分组的发送队列
+
+    - 同一接收者内部严格保持 FIFO
+    - 不同接收者之间可以重排：优先把当前聊天的消息发完再切换
+    - 其他聊天有待发消息时，当前聊天最多连续发送 max_streak 条，之后切到
+      队头最早入队的接收者，避免饿死
+
+    接口与 queue.Queue 完全一致，可直接替换 WxSendWorker 的任务队列。
+    """
+
+    def __init__(self, maxsize=0, max_streak=SEND_AFFINITY_MAX_STREAK):
+        self.max_streak = max_streak
+        super().__init__(maxsize)
+
+    # 以下方法由 Queue 在持有锁的情况下调用
+    def _init(self, maxsize):
+        self.pending = {}       # who -> deque[(seq, task)]
+        self.current = None     # 最近一次出队的接收者
+        self.streak = 0         # 当前接收者已连续出队的条数
+        self._seq = 0
+        self._size = 0
+
+    def _qsize(self):
+        return self._size
+
+    def _put(self, item):
+        self.pending.setdefault(item["who"], deque()).append((self._seq, item))
+        self._seq += 1
+        self._size += 1
+
+    def _get(self):
+        current_tasks = self.pending.get(self.current)
+        has_others = len(self.pending) > (1 if current_tasks else 0)
+        starved = 0 < self.max_streak <= self.streak
+
+        if current_tasks and not (starved and has_others):
+            who = self.current
+        else:
+            # 选择队头最早入队的其他接收者
+            who = min(
+                (w for w in self.pending if w != self.current or not current_tasks),
+                key=lambda w: self.pending[w][0][0],
+            )
+
+        tasks = self.pending[who]
+        _, item = tasks.popleft()
+        if not tasks:
+            del self.pending[who]
+        self._size -= 1
+
+        if who == self.current:
+            self.streak += 1
+        else:
+            self.current = who
+            self.streak = 1
+        return item
@@ -0,0 +1,82 @@
+import importlib
+import importlib.util
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 项目模块位于仓库根目录
+sys.path.insert(0, ROOT)
+
+
+def load_module(relpath, name=None):
+    """
+    按文件路径单独加载 wxauto 包内不依赖 Windows 的模块
+
+    导入 wxauto 包会执行 wxauto/__init__.py，进而导入 comtypes/win32，
+    非 Windows 环境下只能绕过包直接加载这些模块
+    """
+    path = os.path.join(ROOT, relpath)
+    name = name or "_standalone_" + os.path.splitext(relpath)[0].replace(os.sep, "_").replace("/", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class _StubWeChat:
+    """代替 wxauto.WeChat，不连接微信，只记录收到的调用"""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args))
+        return call
+
+
+def _stub_module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def load_processor():
+    """
+    加载 wx_Processer，并用桩模块代替 wxauto（以及未安装时的 maim_message）
+
+    wx_Processer 导入时会启动 UI 线程并创建 WeChat 实例，即使在 Windows 上测试也不应
+    连接真实微信；桩模块只在导入期间放入 sys.modules，不影响其他测试单独加载 wxauto 的模块
+    """
+    if "wx_Processer" in sys.modules:
+        return sys.modules["wx_Processer"]
+
+    class WxParam:
+        DEFALUT_SAVEPATH = os.path.join(ROOT, "wxauto文件")
+
+    uia = _stub_module("wxauto.uiautomation", UIAutomationInitializerInThread=lambda: None)
+    stubs = {
+        "wxauto": _stub_module("wxauto", WeChat=_StubWeChat, uiautomation=uia),
+        "wxauto.uiautomation": uia,
+        "wxauto.elements": _stub_module("wxauto.elements", WxParam=WxParam),
+    }
+    try:
+        importlib.import_module("maim_message")
+    except ImportError:
+        names = ("Router", "RouteConfig", "TargetConfig", "MessageBase",
+                 "BaseMessageInfo", "UserInfo", "GroupInfo", "Seg")
+        stubs["maim_message"] = _stub_module("maim_message", **{n: type(n, (), {}) for n in names})
+
+    saved = {name: sys.modules.get(name) for name in stubs}
+    sys.modules.update(stubs)
+    try:
+        return load_module("wx_Processer.py", "wx_Processer")
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
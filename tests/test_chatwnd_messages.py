@@ -0,0 +1,50 @@
+import pytest
+
+# wxauto.elements 依赖 comtypes/win32，只能在 Windows 上导入
+pytest.importorskip("comtypes")
+pytest.importorskip("win32api")
+
+from wxauto.elements import ChatWnd
+from wxauto.utils import SeenMessageIndex
+
+
+class FakeItem:
+    ControlTypeName = 'ListItemControl'
+
+    def __init__(self, msgid):
+        self.msgid = msgid
+
+
+def _chat(items, getmsgs):
+    """跳过 ChatWnd.__init__（需要真实微信窗口），只保留 GetNewMessage 用到的属性"""
+    chat = ChatWnd.__new__(ChatWnd)
+    chat.who = '群'
+    chat.language = 'cn'
+    chat.usedmsgid = SeenMessageIndex(50)
+    chat._msgitems = lambda: list(items)
+    chat._msgids = lambda msgitems: [item.msgid for item in msgitems]
+    chat._getmsgs = getmsgs
+    return chat
+
+
+def test_new_messages_are_returned_again_after_parse_error():
+    items = [FakeItem((1, i)) for i in range(3)]
+    calls = []
+
+    def getmsgs(msgitems, savepic=False, savefile=False, savevoice=False):
+        calls.append([item.msgid for item in msgitems])
+        if len(calls) == 1:
+            raise RuntimeError('保存图片失败')
+        return [item.msgid for item in msgitems]
+
+    chat = _chat(items, getmsgs)
+    chat.usedmsgid.update([(1, 0)])
+
+    with pytest.raises(RuntimeError):
+        chat.GetNewMessage()
+    # 解析失败的消息没有被记为已处理
+    assert (1, 1) not in chat.usedmsgid
+
+    assert chat.GetNewMessage() == [(1, 1), (1, 2)]
+    assert calls == [[(1, 1), (1, 2)], [(1, 1), (1, 2)]]
+    assert chat.GetNewMessage() == []
@@ -0,0 +1,172 @@
+import threading
+import time
+
+from wx_image_watcher import WxImageIndex, parse_image_ts
+
+
+def _image(directory, ts, suffix="", data=b"img"):
+    path = directory / f"微信图片_{ts}{suffix}.jpg"
+    path.write_bytes(data)
+    return path
+
+
+def _add_later(index, path, delay=0.05):
+    timer = threading.Timer(delay, index.add, args=(path,))
+    timer.start()
+    return timer
+
+
+def test_parse_image_ts():
+    assert parse_image_ts(r"C:\wxauto文件\微信图片_20240102030405.jpg") == "20240102030405"
+    assert parse_image_ts("微信图片_20240102030405_1.png") == "20240102030405"
+    assert parse_image_ts("微信图片_2024.jpg") is None
+    assert parse_image_ts("photo.jpg") is None
+
+
+def test_scan_indexes_only_wechat_images(tmp_path):
+    _image(tmp_path, "20240102030405")
+    (tmp_path / "notes.txt").write_text("x")
+    index = WxImageIndex(tmp_path)
+    index.scan()
+
+    assert len(index) == 1
+    assert index.version == 1
+
+
+def test_scan_missing_directory(tmp_path):
+    index = WxImageIndex(tmp_path / "missing")
+    index.scan()
+    assert len(index) == 0
+
+
+def test_find_prefers_closest_timestamp_within_window(tmp_path):
+    index = WxImageIndex(tmp_path)
+    far = _image(tmp_path, "20240102030403")
+    near = _image(tmp_path, "20240102030406")
+    index.add(far)
+    index.add(near)
+
+    assert index.find("20240102030405", window=2) == near
+    assert index.find("20240102030405", window=0) is None
+    # 超出窗口的图片不会命中
+    assert index.find("20240102030409", window=2) is None
+
+
+def test_find_across_midnight(tmp_path):
+    index = WxImageIndex(tmp_path)
+    path = _image(tmp_path, "20240102000001")
+    index.add(path)
+
+    assert index.find("20240101235959", window=2) == path
+    assert index.find("20240101235958", window=2) is None
+
+
+def test_find_skips_empty_and_deleted_files(tmp_path):
+    index = WxImageIndex(tmp_path)
+    empty = _image(tmp_path, "20240102030405", "_1", data=b"")
+    full = _image(tmp_path, "20240102030405", "_2")
+    index.add(full)
+    index.add(empty)
+    # 同一秒内后落盘的优先，但空文件不算写入完成
+    assert index.find("20240102030405") == full
+
+    full.unlink()
+    assert index.find("20240102030405") is None
+    index.discard(full)
+    index.discard(empty)
+    assert len(index) == 0
+
+
+def test_version_and_latest_since(tmp_path):
+    index = WxImageIndex(tmp_path)
+    first = _image(tmp_path, "20240102030405")
+    index.add(first)
+    version = index.version
+
+    # 重复的 created/modified 事件不计为新图片
+    index.add(first)
+    assert index.version == version
+    assert index.latest_since(version) is None
+
+    second = _image(tmp_path, "20240102030500")
+    third = _image(tmp_path, "20240102030600")
+    index.add(second)
+    index.add(third)
+    assert index.version == version + 2
+    assert index.latest_since(version) == third
+    assert index.latest_since(0) == third
+
+
+def test_recent_is_bounded(tmp_path):
+    index = WxImageIndex(tmp_path)
+    for i in range(100):
+        index.add(_image(tmp_path, f"202401020{i:05d}"))
+
+    assert index.version == 100
+    assert len(index._recent) == index._recent.maxlen
+    assert index.latest_since(0) is not None
+
+
+def test_wait_returns_existing_image_immediately(tmp_path):
+    index = WxImageIndex(tmp_path)
+    path = _image(tmp_path, "20240102030405")
+    index.add(path)
+
+    assert index.wait("20240102030406", timeout=5) == path
+
+
+def test_wait_on_timestamp_wakes_up_when_image_arrives(tmp_path):
+    index = WxImageIndex(tmp_path)
+    path = _image(tmp_path, "20240102030406")
+    timer = _add_later(index, path)
+    started = time.monotonic()
+    try:
+        assert index.wait("20240102030405", timeout=5, window=2) == path
+    finally:
+        timer.cancel()
+    assert time.monotonic() - started < 1
+    # 等待结束后注销，不残留等待者
+    assert index._waiters == {}
+
+
+def test_wait_on_timestamp_ignores_other_images(tmp_path):
+    index = WxImageIndex(tmp_path)
+    other = _image(tmp_path, "20240102040000")
+    timer = _add_later(index, other)
+    try:
+        assert index.wait("20240102030405", timeout=0.3, window=2) is None
+    finally:
+        timer.cancel()
+    assert index._waiters == {}
+
+
+def test_wait_any_returns_only_images_added_after_call(tmp_path):
+    index = WxImageIndex(tmp_path)
+    index.add(_image(tmp_path, "20240102030405"))
+    assert index.wait(None, timeout=0.1) is None
+
+    path = _image(tmp_path, "20240102040000")
+    timer = _add_later(index, path)
+    try:
+        assert index.wait(None, timeout=5) == path
+    finally:
+        timer.cancel()
+    assert index._waiters == {}
+
+
+def test_wait_wakes_again_when_empty_file_is_written(tmp_path):
+    index = WxImageIndex(tmp_path)
+    path = _image(tmp_path, "20240102030405", data=b"")
+    index.add(path)
+
+    def write():
+        path.write_bytes(b"img")
+        # watchdog 的 modified 事件会再次调用 add
+        index.add(path)
+
+    timer = threading.Timer(0.05, write)
+    timer.start()
+    try:
+        assert index.wait("20240102030405", timeout=5) == path
+    finally:
+        timer.cancel()
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from conftest import load_processor
+
+wx_Processer = load_processor()
+ImageFileRef = wx_Processer.ImageFileRef
+MessageProcessor = wx_Processer.MessageProcessor
+
+
+def _processor(max_source_bytes=0):
+    """跳过 MessageProcessor.__init__（会创建 Router），只保留图片负载用到的属性"""
+    processor = MessageProcessor.__new__(MessageProcessor)
+    processor.router = object()
+    processor.loop = None
+    processor._loop_ready = threading.Event()
+    processor.image_preprocessor = None
+    processor.image_cache = None
+    processor.max_source_bytes = max_source_bytes
+    processor._oversize_preprocessor = None
+    processor._oversize_lock = threading.Lock()
+    return processor
+
+
+def _message(path, delete=True):
+    return {
+        "message_info": {},
+        "message_segment": {"type": "image", "data": ImageFileRef(path, delete=delete)},
+        "raw_message": None,
+    }
+
+
+def _wait_removed(path, timeout=3):
+    deadline = time.monotonic() + timeout
+    while path.exists() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not path.exists()
+
+
+def test_image_deleted_when_router_loop_not_running(tmp_path):
+    path = tmp_path / "微信图片_20240102030405.jpg"
+    path.write_bytes(b"img")
+    processor = _processor()
+    loop = asyncio.new_event_loop()
+    processor.loop = loop
+    processor._loop_ready.set()
+    try:
+        result = processor._send_to_maibot(_message(path))
+    finally:
+        loop.close()
+
+    assert result == {"success": False, "error": "Router事件循环未运行"}
+    assert _wait_removed(path)
+
+
+def test_image_deleted_when_router_missing(tmp_path):
+    path = tmp_path / "微信图片_20240102030405.jpg"
+    path.write_bytes(b"img")
+    processor = _processor()
+    processor.router = None
+
+    assert processor._send_to_maibot(_message(path))["success"] is False
+    assert _wait_removed(path)
+
+
+def test_image_kept_when_not_owned(tmp_path):
+    path = tmp_path / "微信图片_20240102030405.jpg"
+    path.write_bytes(b"img")
+    processor = _processor()
+    processor.router = None
+
+    processor._send_to_maibot(_message(path, delete=False))
+    time.sleep(0.2)
+    assert path.exists()
+
+
+def test_small_image_is_sent_as_is(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(b"img")
+    assert _processor(max_source_bytes=1024)._load_image_bytes(path) == b"img"
+
+
+def test_oversize_image_is_downscaled(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "big.png"
+    img = Image.linear_gradient("L").resize((2000, 2000)).convert("RGB")
+    img.save(path, compress_level=0)
+    cap = 1024 * 1024
+    assert path.stat().st_size > cap
+
+    processor = _processor(max_source_bytes=cap)
+    try:
+        data = processor._load_image_bytes(path)
+    finally:
+        processor._oversize_preprocessor.shutdown()
+    assert len(data) <= cap
+    assert data[:2] == b"\xff\xd8"  # JPEG
+
+
+def test_oversize_image_that_cannot_be_downscaled_is_refused(tmp_path):
+    pytest.importorskip("PIL.Image")
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"\0" * 4096)
+
+    processor = _processor(max_source_bytes=1024)
+    try:
+        with pytest.raises(ValueError):
+            processor._load_image_bytes(path)
+    finally:
+        processor._oversize_preprocessor.shutdown()
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from wx_image_preprocess import ImagePreprocessor
+
+
+def _sticker(path, size=2000):
+    """透明背景，左上角一块不透明红色"""
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    img.paste((255, 0, 0, 255), (0, 0, 100, 100))
+    img.save(path)
+    return path
+
+
+@pytest.mark.parametrize("fmt, expected", [("JPEG", (255, 255, 255)), ("WEBP", (0, 0, 0, 0))])
+def test_transparent_background_is_not_black(tmp_path, fmt, expected):
+    prep = ImagePreprocessor(fmt=fmt)
+    try:
+        data = prep.process(_sticker(tmp_path / "sticker.png"))
+        assert data is not None
+        out = Image.open(io.BytesIO(data))
+        assert out.getpixel((out.width // 2, out.height // 2)) == expected
+        assert prep.stats()["images"] == 1
+    finally:
+        prep.shutdown()
+
+
+def test_animated_image_is_not_counted(tmp_path):
+    path = tmp_path / "anim.gif"
+    frames = [Image.new("RGB", (10, 10), (i * 80, 0, 0)) for i in range(3)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+
+    prep = ImagePreprocessor()
+    try:
+        assert prep.process(path) is None
+        assert prep.stats()["images"] == 0
+    finally:
+        prep.shutdown()
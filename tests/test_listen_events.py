@@ -0,0 +1,106 @@
+import threading
+import time
+
+from conftest import load_module
+
+events = load_module("wxauto/events.py")
+ListenEventHub = events.ListenEventHub
+
+
+class FakeSource:
+    """不依赖 UIA 的事件源，记录订阅并由测试直接触发回调"""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.closed = False
+
+    def subscribe(self, who, msglist, callback):
+        self.callbacks[who] = callback
+
+    def unsubscribe(self, who):
+        self.callbacks.pop(who, None)
+
+    def close(self):
+        self.callbacks.clear()
+        self.closed = True
+
+    def fire(self, who):
+        callback = self.callbacks.get(who)
+        if callback is not None:
+            callback(who)
+
+
+class FakeChat:
+    def __init__(self, who):
+        self.who = who
+        self.C_MsgList = object()
+
+
+def _hub(*names):
+    source = FakeSource()
+    hub = ListenEventHub(source)
+    for who in names:
+        hub.watch(FakeChat(who))
+    return hub, source
+
+
+def test_events_are_coalesced_per_chat():
+    hub, source = _hub("a", "b", "c")
+    for _ in range(5):
+        source.fire("a")
+    source.fire("b")
+    source.fire("a")
+
+    assert hub.wait(timeout=0) == {"a", "b"}
+    # 已取走的事件不会再次返回
+    assert hub.wait(timeout=0) == set()
+
+
+def test_wait_times_out_without_events():
+    hub, _ = _hub("a")
+    started = time.monotonic()
+    assert hub.wait(timeout=0.2) == set()
+    assert time.monotonic() - started >= 0.15
+
+
+def test_wait_wakes_up_on_event_from_another_thread():
+    hub, source = _hub("a")
+    timer = threading.Timer(0.05, source.fire, args=("a",))
+    timer.start()
+    started = time.monotonic()
+    try:
+        assert hub.wait(timeout=5) == {"a"}
+    finally:
+        timer.cancel()
+    # 事件到达后立即唤醒，不等兜底超时
+    assert time.monotonic() - started < 1
+
+
+def test_unwatch_drops_pending_and_late_events():
+    hub, source = _hub("a", "b")
+    late_callback = source.callbacks["a"]
+    source.fire("a")
+    source.fire("b")
+
+    hub.unwatch("a")
+    assert "a" not in source.callbacks
+    # UIA 线程中已经在执行的回调可能在取消订阅之后才到达
+    late_callback("a")
+
+    assert hub.wait(timeout=0) == {"b"}
+
+
+def test_close_closes_source_and_clears_state():
+    hub, source = _hub("a")
+    source.fire("a")
+    hub.close()
+
+    assert source.closed
+    assert hub.wait(timeout=0) == set()
+
+
+def test_uia_source_constructs_without_com():
+    # UIA 事件源只在订阅时导入 uiautomation，构造时不访问 COM
+    source = events.UIAMessageEventSource()
+    assert source.handlers == {}
+    source.close()
@@ -0,0 +1,27 @@
+import base64
+
+from wx_image_cache import OutboundMediaCache
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(200))
+
+
+def test_base64_with_line_breaks(tmp_path):
+    cache = OutboundMediaCache(tmp_path)
+    wrapped = base64.encodebytes(PNG).decode("ascii")
+    assert "\n" in wrapped
+
+    path = cache.get_path(wrapped)
+    assert path.read_bytes() == PNG
+    assert cache.get_path("data:image/png;base64," + wrapped).read_bytes() == PNG
+
+
+def test_load_removes_leftover_tmp_files(tmp_path):
+    cache = OutboundMediaCache(tmp_path)
+    path = cache.get_path(base64.b64encode(PNG).decode("ascii"))
+    leftover = tmp_path / "deadbeef.png.tmp"
+    leftover.write_bytes(b"partial")
+
+    reloaded = OutboundMediaCache(tmp_path)
+    assert not leftover.exists()
+    assert reloaded.stats()["entries"] == 1
+    assert reloaded.get_path(base64.b64encode(PNG).decode("ascii")) == path
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from mq_Redis import drain_batch, pop_batch
+
+KEY = "autoText"
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _client(*values):
+    redis = fakeredis.FakeAsyncRedis()
+    for value in values:
+        # 与 mq_Producer 一致，逐条 LPUSH
+        await redis.lpush(KEY, value)
+    return redis
+
+
+def test_pop_batch_keeps_fifo_order():
+    async def scenario():
+        redis = await _client(*[f"m{i}" for i in range(5)])
+        batch = await pop_batch(redis, KEY, batch_size=5, timeout=1)
+        return batch, await redis.llen(KEY)
+
+    batch, remaining = _run(scenario())
+    assert batch == [b"m0", b"m1", b"m2", b"m3", b"m4"]
+    assert remaining == 0
+
+
+def test_pop_batch_leaves_rest_of_backlog():
+    async def scenario():
+        redis = await _client(*[f"m{i}" for i in range(7)])
+        first = await pop_batch(redis, KEY, batch_size=3, timeout=1)
+        second = await pop_batch(redis, KEY, batch_size=3, timeout=1)
+        third = await pop_batch(redis, KEY, batch_size=3, timeout=1)
+        return first, second, third
+
+    first, second, third = _run(scenario())
+    assert first == [b"m0", b"m1", b"m2"]
+    assert second == [b"m3", b"m4", b"m5"]
+    # 积压不足一批时只取出剩余的消息
+    assert third == [b"m6"]
+
+
+def test_drain_batch_partial_batch():
+    async def scenario():
+        redis = await _client("a", "b", "c")
+        _, first = await redis.brpop(KEY, timeout=1)
+        batch = await drain_batch(redis, KEY, first, batch_size=50)
+        return batch, await redis.llen(KEY)
+
+    batch, remaining = _run(scenario())
+    assert batch == [b"a", b"b", b"c"]
+    assert remaining == 0
+
+
+def test_drain_batch_size_one_skips_pipeline():
+    async def scenario():
+        redis = await _client("a", "b")
+        _, first = await redis.brpop(KEY, timeout=1)
+        batch = await drain_batch(redis, KEY, first, batch_size=1)
+        return batch, await redis.lrange(KEY, 0, -1)
+
+    batch, remaining = _run(scenario())
+    assert batch == [b"a"]
+    assert remaining == [b"b"]
+
+
+def test_pop_batch_empty_queue_times_out():
+    async def scenario():
+        redis = await _client()
+        return await pop_batch(redis, KEY, batch_size=10, timeout=1)
+
+    assert _run(scenario()) == []
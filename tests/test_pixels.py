@@ -0,0 +1,71 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import load_module
+
+Image = pytest.importorskip("PIL.Image")
+np = pytest.importorskip("numpy")
+
+pixels = load_module("wxauto/pixels.py")
+
+
+def _image(width, height, seed, red=False):
+    """灰色背景加随机偏绿/偏蓝噪点；red=True 时在右上角放一个红点"""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (235, 235, 235))
+    for _ in range(width * height // 4):
+        x, y = rng.randrange(width), rng.randrange(height)
+        v = rng.randrange(256)
+        img.putpixel((x, y), (v, min(255, v + rng.randrange(1, 40)), v))
+    if red:
+        for dx in range(3):
+            for dy in range(3):
+                img.putpixel((width - 4 + dx, 1 + dy), (250, 81, 81))
+    return img
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_vectorised_matches_loop_on_random_pixels(seed):
+    rng = random.Random(seed)
+    width, height = rng.randrange(1, 60), rng.randrange(1, 60)
+    data = bytes(rng.randrange(256) for _ in range(width * height * 3))
+    img = Image.frombytes("RGB", (width, height), data)
+    assert pixels.HasRedPixel(img) == pixels._has_red_pixel_loop(img)
+
+
+@pytest.mark.parametrize("red", [False, True])
+def test_vectorised_matches_loop_on_chat_icon(red):
+    img = _image(36, 36, seed=1, red=red)
+    assert pixels.HasRedPixel(img) is red
+    assert pixels._has_red_pixel_loop(img) is red
+
+
+def test_ties_are_not_red():
+    # R 只等于 G 或 B 时不算偏红
+    img = Image.new("RGB", (4, 4), (200, 200, 100))
+    img.putpixel((0, 0), (200, 100, 200))
+    assert pixels.HasRedPixel(img) is False
+    assert pixels._has_red_pixel_loop(img) is False
+
+
+def test_non_rgb_and_empty_images():
+    assert pixels.HasRedPixel(Image.new("RGBA", (5, 5), (255, 0, 0, 128))) is True
+    assert pixels.HasRedPixel(Image.new("L", (5, 5), 255)) is False
+    assert pixels.HasRedPixel(Image.new("RGB", (0, 0))) is False
+
+
+def test_buffers_are_reused_for_same_size():
+    pixels.HasRedPixel(_image(20, 20, seed=2))
+    masks = pixels._red_pixel_buffers.masks
+    pixels.HasRedPixel(_image(20, 20, seed=3, red=True))
+    assert pixels._red_pixel_buffers.masks is masks
+    pixels.HasRedPixel(_image(21, 20, seed=4))
+    assert pixels._red_pixel_buffers.masks is not masks
+
+
+def test_badge_box():
+    rect = SimpleNamespace(left=100, top=200, right=140, bottom=240)
+    assert pixels.BadgeBox(rect) == (100, 200, 140, 240)
+    assert pixels.BadgeBox(rect, (0.5, 0, 1, 0.5)) == (120, 200, 140, 220)
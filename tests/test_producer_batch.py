@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import mq_Producer
+
+URL = "/api/messages:batch"
+KEY = mq_Producer.REDIS_QUEUE_KEY
+
+
+def _message(text, group="群"):
+    return {
+        "message_info": {"group_info": {"group_name": group}},
+        "message_segment": {"type": "text", "data": text},
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(mq_Producer, "REDIS_TRANSPORT", "list")
+    redis = fakeredis.FakeAsyncRedis()
+    # 不进入 lifespan，直接替换共享客户端，不连接真实 Redis
+    mq_Producer.app.state.redis = redis
+    client = TestClient(mq_Producer.app)
+    client.redis = redis
+    yield client
+    del mq_Producer.app.state.redis
+
+
+def _queued(client):
+    values = asyncio.run(client.redis.lrange(KEY, 0, -1))
+    # LPUSH 后队列尾部是最早的消息
+    return [json.loads(v)["msg"] for v in reversed(values)]
+
+
+def _post(client, body, content_type="application/json"):
+    response = client.post(URL, content=body.encode("utf-8"), headers={"content-type": content_type})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_json_array(client):
+    body = json.dumps([_message("a"), _message("b")], ensure_ascii=False)
+    result = _post(client, body)
+
+    assert result["code"] == 1
+    assert result["accepted"] == 2
+    assert _queued(client) == ["a", "b"]
+
+
+def test_single_object(client):
+    # 多行缩进的单个对象不应按 NDJSON 逐行解析
+    body = json.dumps(_message("a"), ensure_ascii=False, indent=2)
+    result = _post(client, body)
+
+    assert (result["accepted"], result["total"]) == (1, 1)
+    assert _queued(client) == ["a"]
+
+
+def test_ndjson(client):
+    lines = [json.dumps(_message(text), ensure_ascii=False) for text in ("a", "b", "c")]
+    body = "\n".join(lines[:2]) + "\n\n" + lines[2] + "\n"
+    result = _post(client, body, "application/x-ndjson")
+
+    assert (result["accepted"], result["total"]) == (3, 3)
+    assert _queued(client) == ["a", "b", "c"]
+
+
+def test_ndjson_without_content_type(client):
+    body = "\n".join(json.dumps(_message(text), ensure_ascii=False) for text in ("a", "b"))
+    result = _post(client, body)
+
+    assert result["accepted"] == 2
+    assert _queued(client) == ["a", "b"]
+
+
+def test_ndjson_invalid_line_is_reported_per_item(client):
+    body = json.dumps(_message("a"), ensure_ascii=False) + "\n{bad json\n"
+    result = _post(client, body, "application/x-ndjson")
+
+    assert result["accepted"] == 1
+    assert result["results"][1] == {"index": 1, "code": 0, "msg": "无效的 JSON 格式"}
+    assert _queued(client) == ["a"]
+
+
+@pytest.mark.parametrize("item", [1, "text", None, [_message("x")]])
+def test_non_object_items_are_rejected(client, item):
+    body = json.dumps([_message("a"), item, _message("b")], ensure_ascii=False)
+    result = _post(client, body)
+
+    assert (result["accepted"], result["total"]) == (2, 3)
+    assert result["results"][1] == {"index": 1, "code": 0, "msg": "消息必须是 JSON 对象"}
+    assert _queued(client) == ["a", "b"]
+
+
+def test_invalid_messages_do_not_block_the_batch(client):
+    unsupported = {"message_info": {"group_info": {"group_name": "群"}},
+                   "message_segment": {"type": "image", "data": "xxx"}}
+    body = json.dumps([unsupported, _message("a")], ensure_ascii=False)
+    result = _post(client, body)
+
+    assert result["accepted"] == 1
+    assert result["results"][0]["code"] == 0
+    assert _queued(client) == ["a"]
+
+
+def test_nothing_accepted(client):
+    result = _post(client, "[]")
+    assert (result["code"], result["accepted"], result["total"]) == (0, 0, 0)
+
+    result = _post(client, "[1, 2")
+    assert result == {"code": 0, "msg": "无效的 JSON 格式"}
+    assert _queued(client) == []
@@ -0,0 +1,104 @@
+import asyncio
+
+from conftest import load_processor
+
+MessageProcessor = load_processor().MessageProcessor
+
+
+def _processor(sent):
+    """跳过 MessageProcessor.__init__（会创建 Router），只保留发送队列用到的属性"""
+    processor = MessageProcessor.__new__(MessageProcessor)
+    processor.coalesce_window = 0.05
+    processor.coalesce_max_length = 100
+    processor._carry_item = None
+    processor.send_queue = asyncio.Queue()
+
+    async def send(receiver, content, is_text=False):
+        sent.append((receiver, content, is_text))
+
+    processor._send_to_wechat_sync = send
+    return processor
+
+
+async def _run(items):
+    sent = []
+    processor = _processor(sent)
+    for item in items:
+        processor.send_queue.put_nowait(item)
+    task = asyncio.create_task(processor._process_send_queue())
+    try:
+        await asyncio.wait_for(processor.send_queue.join(), timeout=5)
+    finally:
+        task.cancel()
+    return sent
+
+
+def test_non_text_item_stops_merge_and_is_sent_next():
+    sent = asyncio.run(_run([
+        ("群", "a", True),
+        ("群", "b", True),
+        ("群", "data:image/png;base64,xxx", False),
+        ("群", "c", True),
+    ]))
+    assert sent == [
+        ("群", "a\nb", True),
+        ("群", "data:image/png;base64,xxx", False),
+        ("群", "c", True),
+    ]
+
+
+def test_other_receiver_stops_merge_and_is_sent_next():
+    sent = asyncio.run(_run([
+        ("群", "a", True),
+        ("好友", "b", True),
+        ("好友", "c", True),
+        ("群", "d", True),
+    ]))
+    assert sent == [
+        ("群", "a", True),
+        ("好友", "b\nc", True),
+        ("群", "d", True),
+    ]
+
+
+def test_length_limit_stops_merge():
+    sent = asyncio.run(_run([
+        ("群", "a" * 60, True),
+        ("群", "b" * 60, True),
+    ]))
+    assert sent == [("群", "a" * 60, True), ("群", "b" * 60, True)]
+
+
+def test_window_is_not_extended_by_a_steady_stream():
+    async def scenario():
+        sent = []
+        processor = _processor(sent)
+        processor.coalesce_window = 0.2
+        processor.coalesce_max_length = 10000
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first_sent = loop.create_future()
+
+        async def send(receiver, content, is_text=False):
+            sent.append((receiver, content, is_text))
+            if not first_sent.done():
+                first_sent.set_result(loop.time() - started)
+
+        processor._send_to_wechat_sync = send
+        task = asyncio.create_task(processor._process_send_queue())
+        try:
+            # 每段都在窗口内到达，总共持续约 1 秒
+            for i in range(20):
+                processor.send_queue.put_nowait(("群", f"m{i}", True))
+                await asyncio.sleep(0.05)
+            delay = await asyncio.wait_for(first_sent, timeout=5)
+            await asyncio.wait_for(processor.send_queue.join(), timeout=5)
+        finally:
+            task.cancel()
+        return sent, delay
+
+    sent, delay = asyncio.run(scenario())
+    # 第一次发送最多延迟一个窗口，不会等到整串消息结束
+    assert delay < 0.5
+    assert len(sent) > 1
+    assert "\n".join(content for _, content, _ in sent) == "\n".join(f"m{i}" for i in range(20))
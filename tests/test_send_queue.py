@@ -0,0 +1,93 @@
+from queue import Empty
+
+import pytest
+
+from mq_SendQueue import ReceiverAffinityQueue
+
+
+def _task(who, msg):
+    return {"who": who, "msg": msg}
+
+
+def _drain(queue):
+    items = []
+    while True:
+        try:
+            task = queue.get_nowait()
+        except Empty:
+            return items
+        items.append((task["who"], task["msg"]))
+
+
+def test_fifo_within_each_receiver():
+    queue = ReceiverAffinityQueue(max_streak=0)
+    for i in range(4):
+        queue.put(_task("a", i))
+        queue.put(_task("b", i))
+
+    sent = _drain(queue)
+    assert [msg for who, msg in sent if who == "a"] == [0, 1, 2, 3]
+    assert [msg for who, msg in sent if who == "b"] == [0, 1, 2, 3]
+
+
+def test_current_receiver_is_drained_before_switching():
+    queue = ReceiverAffinityQueue(max_streak=0)
+    queue.put(_task("a", 0))
+    queue.put(_task("b", 0))
+    queue.put(_task("a", 1))
+    queue.put(_task("b", 1))
+
+    # 只在 a 发完后切换一次
+    assert _drain(queue) == [("a", 0), ("a", 1), ("b", 0), ("b", 1)]
+
+
+def test_streak_bound_switches_to_oldest_waiting_receiver():
+    queue = ReceiverAffinityQueue(max_streak=2)
+    queue.put(_task("a", 0))
+    queue.put(_task("c", 0))
+    queue.put(_task("b", 0))
+    for i in range(1, 5):
+        queue.put(_task("a", i))
+
+    assert _drain(queue) == [
+        ("a", 0), ("a", 1),
+        # 连续 2 条后切到队头最早入队的 c，而不是 b
+        ("c", 0),
+        # c 已发完，仍按队头入队顺序选择，b 比 a 剩余的消息更早
+        ("b", 0),
+        ("a", 2), ("a", 3), ("a", 4),
+    ]
+
+
+def test_streak_bound_does_not_apply_without_other_receivers():
+    queue = ReceiverAffinityQueue(max_streak=2)
+    for i in range(5):
+        queue.put(_task("a", i))
+
+    assert _drain(queue) == [("a", i) for i in range(5)]
+
+
+@pytest.mark.parametrize("max_streak", [1, 3, 20])
+def test_no_receiver_waits_longer_than_max_streak(max_streak):
+    queue = ReceiverAffinityQueue(max_streak=max_streak)
+    for i in range(50):
+        queue.put(_task("hot", i))
+    queue.put(_task("cold", 0))
+
+    sent = _drain(queue)
+    # cold 在 hot 连续发送 max_streak 条之后立即发送
+    assert sent.index(("cold", 0)) == max_streak
+    assert len(sent) == 51
+
+
+def test_late_arrivals_for_current_receiver_keep_affinity():
+    queue = ReceiverAffinityQueue(max_streak=0)
+    queue.put(_task("a", 0))
+    queue.put(_task("b", 0))
+
+    assert queue.get_nowait()["who"] == "a"
+    queue.put(_task("a", 1))
+    assert queue.get_nowait() == _task("a", 1)
+    assert queue.get_nowait() == _task("b", 0)
+    assert queue.qsize() == 0
+    assert queue.empty()
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from mq_Redis import StreamConsumer
+
+KEY = "autoText:stream"
+GROUP = "wemai"
+
+
+class FakeSender:
+    """代替 WxSendWorker：只记录交付的消息，由测试决定何时开始/完成发送"""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, msg, on_start=None, on_done=None):
+        self.tasks.append((msg, on_start, on_done))
+        return True
+
+    async def send(self, index, success=True):
+        # on_start 会同步等待事件循环写入计数，必须像真实发送线程一样在其他线程中调用
+        msg, on_start, on_done = self.tasks[index]
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, on_start)
+        await loop.run_in_executor(None, on_done, success)
+
+
+def _consumer(redis, sender, **kwargs):
+    kwargs.setdefault("min_idle_ms", 0)
+    kwargs.setdefault("max_deliveries", 3)
+    return StreamConsumer(redis, sender.submit, key=KEY, group=GROUP, consumer="wx-sender",
+                          batch_size=50, block_timeout=1, **kwargs)
+
+
+async def _add(redis, n):
+    for i in range(n):
+        await redis.xadd(KEY, {"data": f'{{"receiver": "群", "msg": "m{i}"}}'})
+
+
+async def _pending(redis):
+    return (await redis.xpending(KEY, GROUP))["pending"]
+
+
+def test_reclaiming_queued_messages_does_not_drop_them_on_restart():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        await _add(redis, 10)
+
+        sender = FakeSender()
+        consumer = _consumer(redis, sender)
+        await consumer.recover()
+        await consumer._read_new()
+        assert len(sender.tasks) == 10
+
+        # 发送很慢：消息在发送队列里排队期间被反复 XAUTOCLAIM，times_delivered 不断上升
+        for _ in range(6):
+            await consumer.reclaim()
+        assert len(sender.tasks) == 10
+
+        await sender.send(0)
+        await sender.send(1)
+        await consumer._flush_acks()
+        assert await _pending(redis) == 8
+
+        # 重启：新的消费者实例从 PEL 恢复，8 条从未发送过的消息都要重新交付
+        restarted = FakeSender()
+        await _consumer(redis, restarted).recover()
+        assert [msg["msg"] for msg, _, _ in restarted.tasks] == [f"m{i}" for i in range(2, 10)]
+        assert await _pending(redis) == 8
+
+    asyncio.run(scenario())
+
+
+def test_message_failing_max_deliveries_times_is_dropped():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        await _add(redis, 2)
+
+        for attempt in range(3):
+            # 每一轮开始发送第一条，发送线程随后崩溃（on_done 从未调用），进程重启
+            sender = FakeSender()
+            consumer = _consumer(redis, sender)
+            await consumer.recover()
+            await consumer._read_new()
+            msg, on_start, _ = sender.tasks[0]
+            assert msg["msg"] == "m0"
+            await asyncio.get_running_loop().run_in_executor(None, on_start)
+
+        sender = FakeSender()
+        consumer = _consumer(redis, sender)
+        await consumer.recover()
+        # m0 已开始发送 3 次，确认并丢弃；m1 从未发送，继续交付
+        assert [msg["msg"] for msg, _, _ in sender.tasks] == ["m1"]
+        assert await _pending(redis) == 1
+        assert await redis.hget(f"{KEY}:attempts", (await redis.xrange(KEY))[0][0]) is None
+
+    asyncio.run(scenario())
+
+
+def test_successful_send_clears_attempt_count():
+    async def scenario():
+        redis = fakeredis.FakeAsyncRedis()
+        await _add(redis, 1)
+        sender = FakeSender()
+        consumer = _consumer(redis, sender)
+        await consumer.recover()
+        await consumer._read_new()
+        await sender.send(0, success=False)
+        assert await redis.hlen(f"{KEY}:attempts") == 1
+        assert await _pending(redis) == 1
+
+        await consumer.reclaim()
+        await sender.send(1)
+        await consumer._flush_acks()
+        assert await _pending(redis) == 0
+        assert await redis.hlen(f"{KEY}:attempts") == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import pytest
+
+from conftest import load_processor
+
+wx_Processer = load_processor()
+
+
+class FlakyWeChat:
+    """前 failures 次创建失败，模拟微信未启动或未登录"""
+
+    created = 0
+    failures = 0
+
+    def __init__(self):
+        FlakyWeChat.created += 1
+        if FlakyWeChat.created <= FlakyWeChat.failures:
+            raise RuntimeError("微信未登录")
+
+
+@pytest.fixture(autouse=True)
+def flaky_wechat(monkeypatch):
+    monkeypatch.setattr(FlakyWeChat, "created", 0)
+    monkeypatch.setattr(wx_Processer, "WeChat", FlakyWeChat)
+    monkeypatch.setattr(wx_Processer, "wechat", None)
+
+
+def _start(monkeypatch, failures):
+    monkeypatch.setattr(FlakyWeChat, "failures", failures)
+    executor = wx_Processer.UIThreadExecutor()
+    executor.start()
+    return executor
+
+
+def _current_wechat():
+    return wx_Processer.wechat
+
+
+def test_init_failure_fails_job_and_retries(monkeypatch):
+    executor = _start(monkeypatch, failures=2)
+    # 启动时第一次创建失败；第一个任务前重试仍失败，任务以初始化异常结束而不是 AttributeError
+    with pytest.raises(RuntimeError, match="微信未登录"):
+        executor.submit(_current_wechat).result(timeout=5)
+
+    # 下一个任务前再次重试并成功
+    assert isinstance(executor.submit(_current_wechat).result(timeout=5), FlakyWeChat)
+    assert FlakyWeChat.created == 3
+    # 已创建成功后不再重复创建
+    executor.submit(_current_wechat).result(timeout=5)
+    assert FlakyWeChat.created == 3
+    assert executor.stats()["jobs"] == 3
+
+
+def test_init_success_at_startup(monkeypatch):
+    executor = _start(monkeypatch, failures=0)
+    assert isinstance(executor.submit(_current_wechat).result(timeout=5), FlakyWeChat)
+    assert FlakyWeChat.created == 1
@@ -0,0 +1,32 @@
+from datetime import date, datetime
+
+import pytest
+
+# wxauto.utils 依赖 comtypes/win32，只能在 Windows 上导入
+pytest.importorskip("comtypes")
+pytest.importorskip("win32api")
+
+from wxauto.utils import _parse_wechat_time
+
+TODAY = date(2024, 1, 3)  # 星期三
+
+
+@pytest.mark.parametrize("time_str, expected", [
+    ("08:05", (datetime(2024, 1, 3, 8, 5), "2024-01-03 08:05:00")),
+    ("昨天 23:59", (datetime(2024, 1, 2, 23, 59), "2024-01-02 23:59:00")),
+    ("星期一 9:30", (datetime(2024, 1, 1, 9, 30), "2024-01-01 9:30:00")),
+    ("2023年12月31日 7:08", (datetime(2023, 12, 31, 7, 8), "2023-12-31 07:08:00")),
+    ("不是时间", (None, None)),
+])
+def test_parse_wechat_time(time_str, expected):
+    assert _parse_wechat_time(time_str, TODAY) == expected
+
+
+@pytest.mark.parametrize("time_str, text", [
+    ("25:61", "2024-01-03 25:61:00"),
+    ("昨天 24:00", "2024-01-02 24:00:00"),
+    ("星期三 99:99", "2024-01-03 99:99:00"),
+])
+def test_out_of_range_clock_keeps_string(time_str, text):
+    # 与原先一样返回拼接的字符串，只有 datetime 为 None
+    assert _parse_wechat_time(time_str, TODAY) == (None, text)
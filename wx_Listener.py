@@ -4,7 +4,11 @@ import logging
 import time
 from datetime import datetime
 from wxauto import WeChat
-from config import WX_TARGET_CHATS, WX_LISTEN_ALL_IF_EMPTY, WX_EXCLUDED_CHATS
+from config import (
+    WX_TARGET_CHATS, WX_LISTEN_ALL_IF_EMPTY, WX_EXCLUDED_CHATS,
+    WX_LISTEN_MODE, WX_EVENT_FALLBACK_INTERVAL,
+    WX_LISTEN_WORKERS, WX_LISTEN_POLL_TIMEOUT,
+)
 
 # 配置日志
 logging.basicConfig(
@@ -49,11 +53,20 @@ class WeChatListener:
         else:
             logger.info("未指定目标聊天且未启用监听所有聊天，将不会监听任何聊天")
         
+        if WX_LISTEN_WORKERS > 0:
+            self.wx.EnableParallelListen(WX_LISTEN_WORKERS, WX_LISTEN_POLL_TIMEOUT)
+            logger.info(f"已启用并行轮询，线程数 {WX_LISTEN_WORKERS}")
+        use_events = WX_LISTEN_MODE == 'event' and self._enable_events()
+        
         # 开始监听循环
         try:
             while self.running:
-                self._check_new_messages()
-                time.sleep(1)  # 每秒检查一次新消息
+                if use_events:
+                    # 阻塞等待消息列表变化，无事件时按兜底间隔轮询
+                    self._check_new_messages(lambda: self.wx.WaitListenMessage(WX_EVENT_FALLBACK_INTERVAL))
+                else:
+                    self._check_new_messages()
+                    time.sleep(1)  # 每秒检查一次新消息
         except KeyboardInterrupt:
             logger.info("监听被用户中断")
         except Exception as e:
@@ -64,8 +77,20 @@ class WeChatListener:
     def stop_listening(self):
         """停止监听微信消息"""
         self.running = False
+        self.wx.DisableParallelListen()
+        self.wx.DisableListenEvents()
         logger.info("停止监听微信消息")
     
+    def _enable_events(self):
+        """启用事件驱动检测，失败时返回False并退回轮询"""
+        try:
+            self.wx.EnableListenEvents()
+            logger.info(f"已启用事件驱动消息检测，兜底轮询间隔 {WX_EVENT_FALLBACK_INTERVAL} 秒")
+            return True
+        except Exception as e:
+            logger.warning(f"启用事件驱动消息检测失败，退回轮询模式: {str(e)}")
+            return False
+    
     def _add_listen_chat(self, chat_name):
         """添加监听的聊天对象"""
         try:
@@ -86,11 +111,15 @@ class WeChatListener:
             logger.error(f"添加监听聊天 {chat_name} 时发生错误: {str(e)}")
             return False
     
-    def _check_new_messages(self):
-        """检查所有监听的聊天是否有新消息"""
+    def _check_new_messages(self, fetch=None):
+        """检查所有监听的聊天是否有新消息
+        
+        Args:
+            fetch (function, optional): 获取新消息的函数，默认为 self.wx.GetListenMessage
+        """
         try:
             # 获取所有监听聊天的新消息
-            all_messages = self.wx.GetListenMessage()
+            all_messages = fetch() if fetch else self.wx.GetListenMessage()
             
             if all_messages:
                 for chat, messages in all_messages.items():
@@ -1,23 +1,29 @@
-import json
 import logging
 import time
 import hashlib
-import requests
+import base64
 import asyncio
-import websockets
 import threading
 from datetime import datetime
-from config import MAIBOT_API_URL, PLATFORM_ID
+from config import (
+    MAIBOT_API_URL, PLATFORM_ID, SEND_COALESCE_WINDOW_MS, SEND_COALESCE_MAX_LENGTH,
+    IMAGE_MAX_SOURCE_MB, IMAGE_PREPROCESS_ENABLED, IMAGE_MAX_EDGE, IMAGE_OUTPUT_FORMAT,
+    IMAGE_QUALITY, IMAGE_PREPROCESS_WORKERS, IMAGE_CACHE_MAX_MB,
+    OUTBOUND_MEDIA_CACHE_DIR, OUTBOUND_MEDIA_CACHE_MAX_MB,
+)
 from maim_message import Router, RouteConfig, TargetConfig, MessageBase, BaseMessageInfo, UserInfo, GroupInfo, Seg
 import os # Added for file existence check
-import re
-from pathlib import Path
-import time
 from pathlib import Path
 from queue import Queue
+from concurrent.futures import Future
 from wxauto import WeChat
+from wxauto import uiautomation as uia
+from wxauto.elements import WxParam
+from wx_image_watcher import WxImageWatcher, parse_image_ts
+from wx_image_cache import InboundImageCache, OutboundMediaCache
 
-wechat = WeChat()
+# 由 UI 线程创建并独占，其他线程不要直接访问
+wechat = None
 current_chat = None
 # 配置日志
 logging.basicConfig(
@@ -28,8 +34,103 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+class UIThreadExecutor(threading.Thread):
+    """
+    常驻的微信 UI 线程
+
+    UIA/COM 对象只能在创建它们的线程中使用，因此模块级 wechat 实例由本线程
+    初始化 COM 后创建，所有发送任务都通过 submit 投递到本线程串行执行，
+    不再为每条消息创建/销毁线程池。启动时创建失败（如微信未登录）会在
+    下一个任务执行前重试，仍失败时该任务以初始化异常结束。
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True, name="WxUIThread")
+        self.jobs = Queue()
+        self.job_count = 0
+        self.total_wait = 0.0   # 任务在队列中等待的累计时间（秒）
+        self.total_run = 0.0    # 任务实际执行的累计时间（秒）
+        self.last_run = 0.0
+
+    def run(self):
+        # 初始化当前线程的 COM 环境，线程退出时自动反初始化
+        initializer = uia.UIAutomationInitializerInThread()
+        self._init_wechat()
+
+        while True:
+            func, args, future, enqueued = self.jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            try:
+                if wechat is None:
+                    self._init_wechat(raise_error=True)
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                finished = time.perf_counter()
+                self.job_count += 1
+                self.total_wait += started - enqueued
+                self.last_run = finished - started
+                self.total_run += self.last_run
+
+    def _init_wechat(self, raise_error=False):
+        """在本线程中创建模块级 wechat 实例"""
+        global wechat
+        try:
+            wechat = WeChat()
+        except Exception as e:
+            logger.error(f"UI线程初始化微信失败: {str(e)}")
+            if raise_error:
+                raise
+
+    def submit(self, func, *args) -> Future:
+        """投递任务到 UI 线程，返回 concurrent.futures.Future"""
+        future = Future()
+        self.jobs.put((func, args, future, time.perf_counter()))
+        return future
+
+    def stats(self):
+        """
+        获取 UI 线程运行统计
+
+        Returns:
+            dict: queue_depth 排队任务数、jobs 已执行任务数、
+                  avg_wait_ms / avg_run_ms 平均排队/执行耗时、last_run_ms 最近一次执行耗时
+        """
+        n = self.job_count or 1
+        return {
+            "queue_depth": self.jobs.qsize(),
+            "jobs": self.job_count,
+            "avg_wait_ms": self.total_wait / n * 1000,
+            "avg_run_ms": self.total_run / n * 1000,
+            "last_run_ms": self.last_run * 1000,
+        }
+
+
+ui_executor = UIThreadExecutor()
+ui_executor.start()
+
 # MaiBot API 配置已移动到config.py
 
+class ImageFileRef:
+    """消息体中的图片文件引用
+
+    构建消息时只记录路径，发送前才在后台线程编码为 base64，
+    监听线程不读取图片内容，也不会同时持有多份图片数据
+    """
+    __slots__ = ('path', 'delete')
+
+    def __init__(self, path, delete=False):
+        self.path = Path(path)
+        self.delete = delete  # 编码完成后是否删除文件
+
+    def __repr__(self):
+        return f"ImageFileRef({str(self.path)!r})"
+
+
 class MessageProcessor:
     def __init__(self, platform=PLATFORM_ID):
         """
@@ -41,9 +142,41 @@ class MessageProcessor:
         self.platform = platform
         self.router = None
         self.router_task = None
+        # Router所在的常驻事件循环，由start_router设置
+        self.loop = None
+        self._loop_ready = threading.Event()
         # 消息发送队列，确保按顺序发送
         self.send_queue = None  # 将在start_router中初始化
         self.send_task = None
+        # 入站消息队列，监听线程投递，Router事件循环中由单个任务按顺序发给 MaiBot
+        self.inbound_queue = None  # 将在start_router中初始化
+        self.inbound_task = None
+        # 文字合并：窗口期内同一接收者的相邻文字段合并为一次发送
+        self.coalesce_window = SEND_COALESCE_WINDOW_MS / 1000
+        self.coalesce_max_length = SEND_COALESCE_MAX_LENGTH
+        self._carry_item = None  # 合并时取出但不能合并的下一条消息
+        # wxauto文件 目录的 WxImageWatcher，首次需要查找图片时启动，shutdown 时停止
+        self.image_dir = Path(WxParam.DEFALUT_SAVEPATH)
+        self._image_watcher = None
+        self._image_watcher_lock = threading.Lock()
+        # 图片预处理（缩放/重新编码），在独立线程池中执行
+        self.image_preprocessor = None
+        if IMAGE_PREPROCESS_ENABLED:
+            from wx_image_preprocess import ImagePreprocessor
+            self.image_preprocessor = ImagePreprocessor(
+                IMAGE_MAX_EDGE, IMAGE_OUTPUT_FORMAT, IMAGE_QUALITY, IMAGE_PREPROCESS_WORKERS
+            )
+        # 超过大小上限的图片必须缩放后才编码，未启用预处理时按需创建预处理器
+        self.max_source_bytes = IMAGE_MAX_SOURCE_MB * 1024 * 1024
+        self._oversize_preprocessor = None
+        self._oversize_lock = threading.Lock()
+        # 出站媒体缓存，重复的表情包不再解码和写文件
+        self.media_cache = OutboundMediaCache(OUTBOUND_MEDIA_CACHE_DIR, OUTBOUND_MEDIA_CACHE_MAX_MB * 1024 * 1024)
+        # 入站图片内容缓存，重复的表情包/图片不再预处理；
+        # 不预处理时计算 SHA-256 与直接 base64 编码的开销相当，缓存没有收益，不启用
+        self.image_cache = None
+        if IMAGE_CACHE_MAX_MB > 0 and self.image_preprocessor is not None:
+            self.image_cache = InboundImageCache(IMAGE_CACHE_MAX_MB * 1024 * 1024)
         logger.info(f"消息处理器初始化成功，平台：{platform}")
         
         # 初始化Router
@@ -75,11 +208,19 @@ class MessageProcessor:
         """处理消息发送队列，确保按顺序发送"""
         while True:
             try:
-                # 从队列获取消息，等待最多5秒
-                receiver, content = await asyncio.wait_for(self.send_queue.get(), timeout=5.0)
+                if self._carry_item is not None:
+                    # 上一轮合并时取出的消息，优先处理以保持顺序
+                    item, self._carry_item = self._carry_item, None
+                else:
+                    # 从队列获取消息，等待最多5秒
+                    item = await asyncio.wait_for(self.send_queue.get(), timeout=5.0)
+                receiver, content, is_text = item
+                
+                if is_text and self.coalesce_window > 0:
+                    content = await self._coalesce_text(receiver, content)
                 
                 # 执行实际的发送操作
-                await self._send_to_wechat_sync(receiver, content)
+                await self._send_to_wechat_sync(receiver, content, is_text)
                 
                 # 标记任务完成
                 self.send_queue.task_done()
@@ -91,6 +232,46 @@ class MessageProcessor:
                 import traceback
                 logger.error(f"错误详情: {traceback.format_exc()}")
     
+    async def _coalesce_text(self, receiver, content):
+        """
+        合并窗口期内发给同一接收者的相邻文字段
+        
+        MaiBot 常把一条回复拆成多个 text 段，逐段发送要各自付出一次
+        剪贴板、Ctrl+V、回车的开销。这里从第一段起的 coalesce_window 内继续从队列取消息
+        （窗口不随合并顺延，第一段最多延迟一个窗口），
+        只要是同一接收者的文字且总长度不超过 coalesce_max_length，就用换行拼接；
+        遇到不能合并的消息则暂存到 _carry_item，下一轮优先发送。
+        
+        Args:
+            receiver (str): 接收者
+            content (str): 第一段文字
+        
+        Returns:
+            str: 合并后的文字
+        """
+        parts = [content]
+        length = len(content)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_window
+        while True:
+            try:
+                item = await asyncio.wait_for(self.send_queue.get(), timeout=max(0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+            next_receiver, next_content, next_is_text = item
+            if (next_receiver == receiver and next_is_text
+                    and length + 1 + len(next_content) <= self.coalesce_max_length):
+                parts.append(next_content)
+                length += 1 + len(next_content)
+                self.send_queue.task_done()
+                continue
+            self._carry_item = item
+            break
+        
+        if len(parts) > 1:
+            logger.info(f"已合并 {len(parts)} 段文字消息: {receiver}")
+        return "\n".join(parts)
+    
     def start_router(self):
         """启动Router"""
         try:
@@ -98,6 +279,9 @@ class MessageProcessor:
                 # 创建新的事件循环
                 loop = asyncio.new_event_loop()
                 asyncio.set_event_loop(loop)
+                self.loop = loop
+                # 事件循环真正开始运行后才通知监听线程可以投递
+                loop.call_soon(self._loop_ready.set)
                 
                 # 初始化消息发送队列
                 self.send_queue = asyncio.Queue()
@@ -106,11 +290,20 @@ class MessageProcessor:
                 self.send_task = loop.create_task(self._process_send_queue())
                 logger.info("消息发送队列已启动")
                 
+                # 启动入站消息队列处理任务
+                self.inbound_queue = asyncio.Queue()
+                self.inbound_task = loop.create_task(self._process_inbound_queue())
+                
                 # 启动Router
                 self.router_task = loop.run_until_complete(self.router.run())
-                logger.info("Router已启动")
+                logger.error("Router已停止运行")
         except Exception as e:
             logger.error(f"Router启动失败: {str(e)}")
+        finally:
+            # 启动失败时也解除等待，之后的消息直接按事件循环未运行处理
+            self._loop_ready.set()
+            if self.inbound_queue is not None and self.inbound_queue.qsize():
+                logger.error(f"Router停止时仍有 {self.inbound_queue.qsize()} 条消息未发送到 MaiBot")
     
     async def _handle_maibot_response(self, message):
         """处理来自MaiBot的回复消息"""
@@ -172,7 +365,7 @@ class MessageProcessor:
                 elif message_segment.type == "text":
                     # 文字消息
                     reply_content = message_segment.data
-                    await self._send_to_wechat(receiver, reply_content)
+                    await self._send_to_wechat(receiver, reply_content, is_text=True)
                     logger.info(f"已处理文字消息: {reply_content[:50]}...")
                 elif message_segment.type == "image":
                     # 图片消息
@@ -221,93 +414,62 @@ class MessageProcessor:
             import traceback
             logger.error(f"错误详情: {traceback.format_exc()}")
     
-    async def _send_to_wechat(self, receiver, content):
-        """发送消息到微信（添加到队列，确保按顺序发送）"""
+    async def _send_to_wechat(self, receiver, content, is_text=False):
+        """发送消息到微信（添加到队列，确保按顺序发送）
+        
+        Args:
+            receiver (str): 接收者
+            content (str): 消息内容
+            is_text (bool): 是否为纯文字段，纯文字段可参与合并发送
+        """
         try:
             # 检查队列是否已初始化
             if self.send_queue is None:
                 logger.warning("消息发送队列未初始化，直接发送消息")
-                await self._send_to_wechat_sync(receiver, content)
+                await self._send_to_wechat_sync(receiver, content, is_text)
                 return
             
             # 将消息添加到发送队列
-            await self.send_queue.put((receiver, content))
+            await self.send_queue.put((receiver, content, is_text))
             logger.info(f"消息已添加到发送队列: {receiver} - {content[:50]}...")
         except Exception as e:
             logger.error(f"添加消息到发送队列失败: {str(e)}")
             # 如果队列失败，尝试直接发送
             try:
-                await self._send_to_wechat_sync(receiver, content)
+                await self._send_to_wechat_sync(receiver, content, is_text)
             except Exception as e2:
                 logger.error(f"直接发送消息也失败: {str(e2)}")
     
-    async def _send_to_wechat_sync(self, receiver, content):
-        """实际执行发送消息到微信的操作"""
+    async def _send_to_wechat_sync(self, receiver, content, is_text=False):
+        """实际执行发送消息到微信的操作
+
+        Args:
+            receiver (str): 接收者
+            content (str): 消息内容
+            is_text (bool): 是否为纯文字段，纯文字段直接发送，不做图片判断
+        """
         try:
-            # 使用asyncio在线程池中执行同步操作
-            import asyncio
-            import concurrent.futures
-            
             def send_message():
                 global current_chat
                 try:
-                    from wxauto import WeChat
-                    import base64
-                    import tempfile
-                    import os
                     if current_chat != receiver:
                         wechat.ChatWith(receiver)
                         current_chat = receiver
                     
-                    # 检查是否是base64编码的图片数据
-                    if isinstance(content, str) and (content.startswith('data:image/') or len(content) > 1000 and content.replace('+', '').replace('/', '').replace('=', '').isalnum()):
-                        # 可能是base64编码的图片
+                    # 非文字段中的 data URL 或长字符串视为 base64 图片/表情包
+                    if not is_text and isinstance(content, str) and (content.startswith('data:image/') or len(content) > 1000):
                         try:
-                            # 尝试解码base64数据
-                            file_extension = '.png'  # 默认扩展名
-                            if content.startswith('data:image/'):
-                                # 处理data URL格式，提取文件类型
-                                header, encoded = content.split(",", 1)
-                                if 'gif' in header.lower():
-                                    file_extension = '.gif'
-                                elif 'jpeg' in header.lower() or 'jpg' in header.lower():
-                                    file_extension = '.jpg'
-                                elif 'png' in header.lower():
-                                    file_extension = '.png'
-                                image_data = base64.b64decode(encoded)
-                            else:
-                                # 处理纯base64编码，尝试检测文件类型
-                                image_data = base64.b64decode(content)
-                                # 检查GIF文件头
-                                if image_data.startswith(b'GIF8'):
-                                    file_extension = '.gif'
-                                # 检查JPEG文件头
-                                elif image_data.startswith(b'\xff\xd8\xff'):
-                                    file_extension = '.jpg'
-                                # 检查PNG文件头
-                                elif image_data.startswith(b'\x89PNG'):
-                                    file_extension = '.png'
-                            
-                            # 创建临时文件，使用正确的扩展名
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-                                temp_file.write(image_data)
-                                temp_file_path = temp_file.name
-                            
-                            # 发送图片文件
-                            wechat.SendFiles(temp_file_path, receiver)
-                            logger.info(f"已发送base64图片到微信: {receiver}")
-                            
-                            # 删除临时文件
-                            try:
-                                os.unlink(temp_file_path)
-                            except:
-                                pass
-                                
+                            # 按内容哈希复用已解码的文件，非法 base64 在解码时抛出异常
+                            media_path = self.media_cache.get_path(content)
                         except Exception as e:
                             logger.error(f"处理base64图片失败: {str(e)}")
                             # 如果base64解码失败，尝试作为文字发送
                             wechat.SendMsg(content, receiver)
                             logger.info(f"base64解码失败，发送文字内容: {receiver} - {content[:50]}...")
+                        else:
+                            # 缓存文件路径固定，发送后不删除
+                            wechat.SendFiles(str(media_path), receiver)
+                            logger.info(f"已发送base64图片到微信: {receiver}")
                     
                     # 检查是否是图片/表情包路径
                     elif isinstance(content, str) and (content.endswith(('.jpg', '.jpeg', '.png', '.gif', '.bmp')) or content.startswith('[') and ']' in content):
@@ -328,10 +490,10 @@ class MessageProcessor:
                     logger.error(f"发送微信消息失败: {str(e)}")
                     raise e
             
-            # 在线程池中执行并等待完成
-            loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                await loop.run_in_executor(executor, send_message)
+            # 投递到常驻 UI 线程执行并等待完成
+            await asyncio.wrap_future(ui_executor.submit(send_message))
+            stats = ui_executor.stats()
+            logger.debug(f"UI线程: 排队 {stats['queue_depth']} | 本次耗时 {stats['last_run_ms']:.0f}ms")
             
         except Exception as e:
             logger.error(f"发送微信消息时发生错误: {str(e)}")
@@ -385,57 +547,25 @@ class MessageProcessor:
         
         return (has_path_separator and has_image_extension) or has_wxauto_path
 
-    def _extract_wechat_time_prefix(self, path: str):
-        name = os.path.basename(path)
-        m = re.search(r"微信图片_(\d{14})", name)
-        return m.group(1) if m else None
-
-    def _find_real_wechat_image(self, fake_path: str, timeout=10):
-        """
-        在 wxauto文件 目录中查找真实微信图片（Windows 稳定版）
-        """
-        import time
-        import re
-        from pathlib import Path
-
-        wxauto_dir = Path(os.getcwd()) / "wxauto文件"
-        if not wxauto_dir.exists():
-            logger.error(f"wxauto文件目录不存在: {wxauto_dir}")
-            return None
-
-        # ✅ 只提取前 14 位时间：YYYYMMDDHHMMSS
-        name = os.path.basename(fake_path)
-        m = re.search(r"微信图片_(\d{14})", name)
-        if not m:
-            logger.error(f"无法解析图片时间前缀: {name}")
-            return None
-
-        time_prefix = m.group(1)
-        logger.warning(f"🔍 在 wxauto文件 中查找图片，时间前缀={time_prefix}")
-
-        start = time.time()
-        while time.time() - start < timeout:
-            candidates = []
-
-            for f in wxauto_dir.glob(f"微信图片_{time_prefix}*.jpg"):
-                try:
-                    stat = f.stat()
-                    if stat.st_size > 0:
-                        candidates.append((stat.st_mtime, f))
-                except:
-                    continue
-
-            if candidates:
-                # 选“最后写入完成”的那个
-                candidates.sort(key=lambda x: x[0], reverse=True)
-                best = candidates[0][1]
-                logger.warning(f"✅ 命中真实微信图片文件: {best}")
-                return str(best)
-
-            time.sleep(0.2)
-
-        logger.error(f"❌ 超时仍未找到微信图片: {time_prefix}")
-        return None
+    def _image_index(self):
+        """返回 wxauto文件 目录的图片索引，首次调用时启动 watchdog 监听并扫描一次目录"""
+        with self._image_watcher_lock:
+            if self._image_watcher is None:
+                watcher = WxImageWatcher(self.image_dir)
+                watcher.start()
+                self._image_watcher = watcher
+            return self._image_watcher.index
+
+    def shutdown(self):
+        """停止图片目录监听和预处理线程池"""
+        with self._image_watcher_lock:
+            watcher, self._image_watcher = self._image_watcher, None
+        if watcher is not None:
+            watcher.stop()
+        if self.image_preprocessor is not None:
+            self.image_preprocessor.shutdown()
+        if self._oversize_preprocessor is not None:
+            self._oversize_preprocessor.shutdown()
 
     def _build_maibot_message(self, chat_name, message_data):
         """
@@ -503,18 +633,10 @@ class MessageProcessor:
         image_recognition_enabled = os.getenv('IMAGE_RECOGNITION_ENABLED', 'true').lower() == 'true'
         
         # 检查是否是图片路径消息且启用了图像识别
-        import base64
         import time as time_module
-        # ⭐ 预编译（模块级只做一次，性能提升很大）
-        WECHAT_IMG_RE = re.compile(r"微信图片_(\d{14})")
-
         if self._is_image_path_message(content):
             try:
                 raw_path = Path(content)
-                wxauto_dir = raw_path.parent
-
-                logger.warning(f"📁 图片监听目录: {wxauto_dir}")
-
                 real_path = None
 
                 # ==================================================
@@ -528,38 +650,17 @@ class MessageProcessor:
                     pass
 
                 # ==================================================
-                # ⭐ STEP 2：一次性目录扫描（性能关键优化）
+                # ⭐ STEP 2：查目录索引（watchdog 增量维护，与文件数量无关）
+                # 与原先扫描目录一致，路径不在 wxauto文件 目录下时也在该目录中查找；
+                # 直命中时不启动监听
                 # ==================================================
+                base_ts = parse_image_ts(content)
                 if not real_path:
-                    match = WECHAT_IMG_RE.search(content)
-                    if match and wxauto_dir.exists():
-                        base_ts = int(match.group(1))
-
-                        # ⭐⭐⭐ 只扫一次目录
-                        all_files = list(wxauto_dir.glob("微信图片_*.*"))
-
-                        best_file = None
-                        best_score = 999999
-
-                        for f in all_files:
-                            m = WECHAT_IMG_RE.search(f.name)
-                            if not m:
-                                continue
-
-                            try:
-                                ts = int(m.group(1))
-                                diff = abs(ts - base_ts)
-
-                                # ⭐ 时间窗口 ±2 秒
-                                if diff <= 2 and f.stat().st_size > 0:
-                                    if diff < best_score:
-                                        best_score = diff
-                                        best_file = f
-                            except Exception:
-                                continue
-
-                        if best_file:
-                            real_path = best_file
+                    index = self._image_index()
+                    if base_ts:
+                        # ⭐ 时间窗口 ±2 秒
+                        real_path = index.find(base_ts, window=2)
+                        if real_path:
                             logger.warning(f"🧭 时间匹配命中: {real_path}")
 
                 # ==================================================
@@ -567,20 +668,11 @@ class MessageProcessor:
                 # ==================================================
                 if not real_path:
                     logger.warning("⏳ 进入兜底等待模式")
-
-                    before = {f.name for f in wxauto_dir.glob("微信图片_*.*")}
-                    start_time = time_module.time()
-
-                    while time_module.time() - start_time < 10:  # ⭐ 缩短等待
-                        current_files = list(wxauto_dir.glob("微信图片_*.*"))
-                        for f in current_files:
-                            if f.name not in before and f.stat().st_size > 0:
-                                real_path = f
-                                logger.warning(f"🆕 捕获新图片: {real_path}")
-                                break
-                        if real_path:
-                            break
-                        time_module.sleep(0.15)
+                    # 阻塞等待 watchdog 通知该时间戳（±2 秒）的图片落盘，不会取到其他消息的图片；
+                    # 只有解析不出时间戳时才等待任意新图片
+                    real_path = index.wait(base_ts, timeout=10, window=2)
+                    if real_path:
+                        logger.warning(f"🆕 捕获新图片: {real_path}")
 
                 if not real_path:
                     raise Exception("未能定位到微信图片文件")
@@ -614,35 +706,14 @@ class MessageProcessor:
                 logger.warning("📦 图片已稳定")
 
                 # ==================================================
-                # ⭐ STEP 5：读取（保持最快路径）
+                # ⭐ STEP 5：只记录文件引用，发送前在后台线程分块编码并删除文件
                 # ==================================================
-                with open(real_path, "rb") as f:
-                    image_base64 = base64.b64encode(f.read()).decode("utf-8")
-
                 message_segment = {
                     "type": "image",
-                    "data": image_base64
+                    "data": ImageFileRef(real_path, delete=True)
                 }
 
-                logger.warning("✅ 图片读取成功")
-
-                # ==================================================
-                # ⭐ STEP 6：非阻塞删除（性能关键）
-                # ==================================================
-                def _async_delete(p: Path):
-                    for _ in range(8):
-                        try:
-                            os.remove(p)
-                            return
-                        except Exception:
-                            time_module.sleep(0.2)
-
-                import threading
-                threading.Thread(
-                    target=_async_delete,
-                    args=(real_path,),
-                    daemon=True
-                ).start()
+                logger.warning("✅ 图片已定位")
 
             except Exception as e:
                 logger.error(f"图片处理失败: {e}")
@@ -683,28 +754,138 @@ class MessageProcessor:
             # logger.info(f"发送消息到 MaiBot: {json.dumps(message, ensure_ascii=False)}")
             logger.info(f"请求URL: {MAIBOT_API_URL}")
             
-            # 使用Router发送消息
-            if self.router:
-                # 创建新的事件循环
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                # 将字典消息转换为MessageBase对象
-                message_base = self._dict_to_message_base(message)
-                
-                # 发送消息
-                result = loop.run_until_complete(self.router.send_message(message_base))
-                loop.close()
-                
-                return {"success": True, "data": "消息已发送"}
-            else:
+            if not self.router:
                 logger.error("Router未初始化")
+                self._release_image_payload(message)
                 return {"success": False, "error": "Router未初始化"}
+            
+            # Router正在后台启动、事件循环尚未运行时等待就绪；从未在后台启动时不等待
+            if self.loop is not None and not self._loop_ready.is_set():
+                self._loop_ready.wait(timeout=5)
+            
+            if self.loop is not None and self.loop.is_running():
+                # 放入Router常驻事件循环中的入站队列，监听线程不等待图片编码和网络IO；
+                # 由单个任务按入队顺序发送，图片消息不会被之后的文字消息超过
+                self.loop.call_soon_threadsafe(self.inbound_queue.put_nowait, message)
+                return {"success": True, "data": "消息已提交发送"}
+            
+            if self.loop is not None:
+                # Router曾在后台启动但已失败或退出，投递到停止的事件循环会静默丢失消息
+                logger.error("Router事件循环未运行，消息未发送到 MaiBot")
+                self._release_image_payload(message)
+                return {"success": False, "error": "Router事件循环未运行"}
+            
+            # Router未在后台启动（如单独运行本模块），退回到临时事件循环同步发送
+            message_base = self._dict_to_message_base(self._resolve_image_payload(message))
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.router.send_message(message_base))
+            finally:
+                loop.close()
+            return {"success": True, "data": "消息已发送"}
         
         except Exception as e:
             logger.error(f"与 MaiBot 通信时发生未知错误: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    async def _process_inbound_queue(self):
+        """按入队顺序把入站消息发送给 MaiBot，上一条（含图片编码）发送完成后才处理下一条"""
+        while True:
+            message = await self.inbound_queue.get()
+            try:
+                await self._send_message_async(message)
+            except Exception as e:
+                logger.error(f"发送消息到 MaiBot 失败: {str(e)}")
+            finally:
+                self.inbound_queue.task_done()
+
+    async def _send_message_async(self, message):
+        """在Router事件循环中发送消息，图片引用先在线程池中编码"""
+        if isinstance(message["message_segment"].get("data"), ImageFileRef):
+            loop = asyncio.get_running_loop()
+            executor = self.image_preprocessor.executor if self.image_preprocessor else None
+            message = await loop.run_in_executor(executor, self._resolve_image_payload, message)
+        await self.router.send_message(self._dict_to_message_base(message))
+
+    def _resolve_image_payload(self, message):
+        """把消息段中的图片文件引用编码为 base64，返回新的消息字典"""
+        ref = message["message_segment"].get("data")
+        if not isinstance(ref, ImageFileRef):
+            return message
+        try:
+            cache_key, encoded = self.image_cache.lookup(ref.path) if self.image_cache else (None, None)
+            if encoded is not None:
+                logger.info(f"图片命中缓存: {cache_key[:12]}")
+            else:
+                encoded = base64.b64encode(self._load_image_bytes(ref.path)).decode("ascii")
+                if cache_key is not None:
+                    self.image_cache.store(cache_key, encoded)
+            segment = {"type": "image", "data": encoded}
+            logger.warning("✅ 图片读取成功")
+        except Exception as e:
+            logger.error(f"图片处理失败: {e}")
+            segment = {"type": "text", "data": "[图片接收失败]"}
+        finally:
+            if ref.delete:
+                self._delete_file_later(ref.path)
+        return {**message, "message_segment": segment}
+
+    def _release_image_payload(self, message):
+        """消息不再发送时删除其中待删除的图片文件，避免残留在 wxauto文件 目录"""
+        ref = message["message_segment"].get("data")
+        if isinstance(ref, ImageFileRef) and ref.delete:
+            self._delete_file_later(ref.path)
+
+    def _load_image_bytes(self, path):
+        """
+        读取待编码的图片数据，超过 max_source_bytes 的图片先缩放
+
+        编码峰值内存约为返回数据的 2.7 倍，由大小上限约束
+
+        Raises:
+            ValueError: 缩放后仍超过上限（如动图、无法识别的图片）
+        """
+        size = os.path.getsize(path)
+        oversize = 0 < self.max_source_bytes < size
+        preprocessor = self.image_preprocessor
+        if preprocessor is None and oversize:
+            preprocessor = self._get_oversize_preprocessor()
+        data = preprocessor.process(path) if preprocessor else None
+        if data is None:
+            if oversize:
+                raise ValueError(f"图片过大且无法缩放: {size} 字节，上限 {self.max_source_bytes} 字节")
+            with open(path, "rb") as f:
+                return f.read()
+        if 0 < self.max_source_bytes < len(data):
+            raise ValueError(f"图片缩放后仍过大: {len(data)} 字节，上限 {self.max_source_bytes} 字节")
+        return data
+
+    def _get_oversize_preprocessor(self):
+        """未启用预处理时，为超过大小上限的图片按需创建预处理器"""
+        with self._oversize_lock:
+            if self._oversize_preprocessor is None:
+                from wx_image_preprocess import ImagePreprocessor
+                self._oversize_preprocessor = ImagePreprocessor(
+                    IMAGE_MAX_EDGE, IMAGE_OUTPUT_FORMAT, IMAGE_QUALITY, workers=1
+                )
+            return self._oversize_preprocessor
+
+    def _delete_file_later(self, path):
+        """非阻塞删除文件，文件被占用时稍后重试"""
+        def _async_delete(p: Path):
+            for _ in range(8):
+                try:
+                    os.remove(p)
+                    return
+                except Exception:
+                    time.sleep(0.2)
+
+        threading.Thread(
+            target=_async_delete,
+            args=(path,),
+            daemon=True
+        ).start()
+
     def _dict_to_message_base(self, message_dict):
         """将字典消息转换为MessageBase对象"""
         try:
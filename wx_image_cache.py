@@ -0,0 +1,209 @@
+import os
+import base64
+import hashlib
+import mmap
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # 空文件无法映射
+            return digest.hexdigest()
+        with mm:
+            for start in range(0, len(mm), chunk_size):
+                digest.update(mm[start:start + chunk_size])
+    return digest.hexdigest()
+
+
+class InboundImageCache:
+    """
+    入站图片的内容寻址缓存
+
+    以 SHA-256 为键缓存预处理并编码好的图片负载，群里反复转发的同一张表情包/图片
+    只预处理、编码一次；只有字节完全相同的图片才会命中，不做相似图片匹配。
+    命中后仍要把完整负载发给 MaiBot（消息协议没有引用已发送图片的方式），
+    省下的只是预处理和编码。按负载总字节数做 LRU 淘汰。
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # sha256 -> payload
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def lookup(self, path):
+        """
+        查找图片对应的缓存负载
+
+        Returns:
+            tuple: (sha256, payload)，未命中时 payload 为 None，之后用同一个 sha256 调用 store
+        """
+        sha = file_sha256(path)
+        with self._lock:
+            payload = self._entries.get(sha)
+            if payload is None:
+                self.misses += 1
+                return sha, None
+            self._entries.move_to_end(sha)
+            self.hits += 1
+            self.bytes_saved += len(payload)
+            return sha, payload
+
+    def store(self, sha, payload):
+        """缓存 lookup 未命中的图片编码结果"""
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if sha in self._entries:
+                return
+            self._entries[sha] = payload
+            self.size += len(payload)
+            while self.size > self.max_bytes:
+                _, old = self._entries.popitem(last=False)
+                self.size -= len(old)
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            dict: entries 条目数、size 占用字节、hits / misses 命中/未命中次数、bytes_saved 免于重新编码的字节数
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+class OutboundMediaCache:
+    """
+    出站媒体的磁盘缓存
+
+    MaiBot 发来的 base64 图片/表情包按内容哈希解码落盘，路径固定为 <目录>/<哈希><扩展名>，
+    重复的表情包直接复用已有文件，不再解码和写入临时文件。按文件总字节数做 LRU 淘汰。
+    """
+
+    def __init__(self, directory, max_bytes=128 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # 哈希 -> (Path, 字节数)
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """启动时按修改时间恢复已有缓存文件，并清理上次写入中断留下的 .tmp 文件"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith(".tmp"):
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    logger.debug(f"删除临时文件失败: {entry.path} - {e}")
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, Path(entry.path), stat.st_size))
+        for _, path, size in sorted(files):
+            self._entries[path.stem] = (path, size)
+            self.size += size
+        self._evict()
+
+    @staticmethod
+    def _sniff_extension(data, header=""):
+        header = header.lower()
+        if "gif" in header or data.startswith(b"GIF8"):
+            return ".gif"
+        if "jpeg" in header or "jpg" in header or data.startswith(b"\xff\xd8\xff"):
+            return ".jpg"
+        return ".png"
+
+    def get_path(self, content):
+        """
+        返回 base64 媒体内容对应的本地文件路径，不存在时解码写入
+
+        Args:
+            content (str): data URL 或纯 base64 字符串
+
+        Returns:
+            Path: 缓存文件路径
+
+        Raises:
+            binascii.Error / ValueError: 内容不是合法的 base64
+        """
+        key = hashlib.sha256(content.encode("ascii", "ignore")).hexdigest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0].exists():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if content.startswith("data:image/"):
+            header, encoded = content.split(",", 1)
+        else:
+            header, encoded = "", content
+        # 允许 base64 中带换行等空白（如按 76 列折行），校验前先去掉
+        data = base64.b64decode("".join(encoded.split()), validate=True)
+        path = self.directory / (key + self._sniff_extension(data, header))
+        temp = path.with_name(path.name + ".tmp")
+        with open(temp, "wb") as f:
+            f.write(data)
+        os.replace(temp, path)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (path, len(data))
+            self.size += len(data)
+            self.misses += 1
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep=None):
+        while self.size > self.max_bytes and self._entries:
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            path, size = self._entries.pop(key)
+            self.size -= size
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.debug(f"删除缓存文件失败: {path} - {e}")
+
+    def stats(self):
+        """
+        获取缓存统计
+
+        Returns:
+            dict: entries 文件数、size 占用字节、hits / misses 命中/未命中次数
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,119 @@
+import io
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePreprocessor:
+    """
+    入站图片预处理
+
+    限制长边、按目标质量重新编码为 JPEG/WebP，并去掉 EXIF 等元数据，
+    减小发往 MaiBot 的负载。编码在独立线程池中执行，不阻塞监听线程和 Router 事件循环。
+    """
+
+    FORMATS = {"JPEG": "JPEG", "JPG": "JPEG", "WEBP": "WEBP"}
+
+    def __init__(self, max_edge=1280, fmt="JPEG", quality=80, workers=2):
+        self.max_edge = max_edge
+        self.format = self.FORMATS.get(fmt.upper(), "JPEG")
+        self.quality = quality
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ImagePrep")
+        self._lock = threading.Lock()
+        self.images = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_time = 0.0
+
+    def process(self, path):
+        """
+        预处理图片文件
+
+        动图、无法识别的图片以及处理后反而变大的图片保持原样
+
+        Args:
+            path: 图片路径
+
+        Returns:
+            bytes | None: 处理后的图片数据；保持原样时返回 None
+        """
+        started = time.perf_counter()
+        original_size = os.path.getsize(path)
+        try:
+            with Image.open(path) as img:
+                if getattr(img, "is_animated", False):
+                    return None
+                img.load()
+                if self.max_edge and max(img.size) > self.max_edge:
+                    img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+                img = self._convert_mode(img)
+                buffer = io.BytesIO()
+                # 不传 exif / icc_profile，元数据随之去掉
+                img.save(buffer, self.format, quality=self.quality, optimize=True)
+                data = buffer.getvalue()
+        except Exception as e:
+            logger.warning(f"图片预处理失败，按原图发送: {e}")
+            return None
+
+        elapsed = time.perf_counter() - started
+        size = min(len(data), original_size)
+        with self._lock:
+            self.images += 1
+            self.bytes_in += original_size
+            self.bytes_out += size
+            self.total_time += elapsed
+        logger.info(
+            f"图片预处理: {original_size} -> {size} 字节，"
+            f"节省 {original_size - size} 字节，耗时 {elapsed * 1000:.0f}ms"
+        )
+
+        if len(data) >= original_size:
+            return None
+        return data
+
+    def _convert_mode(self, img):
+        """
+        转换为目标格式支持的色彩模式
+
+        带透明通道的图片（RGBA / LA / 含 transparency 的调色板图）：
+        WEBP 保留 RGBA；JPEG 不支持透明，先合成到白色背景上，避免透明贴纸变成黑底
+        """
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (
+            img.mode == "P" and "transparency" in img.info
+        )
+        if has_alpha:
+            rgba = img.convert("RGBA")
+            if self.format == "WEBP":
+                return rgba
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            return background
+        if img.mode != "RGB":
+            return img.convert("RGB")
+        return img
+
+    def stats(self):
+        """
+        获取预处理统计
+
+        Returns:
+            dict: images 处理张数、bytes_in / bytes_out 处理前后总字节数、
+                  bytes_saved 节省字节数、avg_ms 平均耗时
+        """
+        with self._lock:
+            n = self.images or 1
+            return {
+                "images": self.images,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "avg_ms": self.total_time / n * 1000,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
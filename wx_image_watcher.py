@@ -1,48 +1,207 @@
+import os
+import re
 import time
 import threading
 import logging
+from collections import deque
+from datetime import datetime, timedelta
 from pathlib import Path
-from queue import Queue
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 logger = logging.getLogger(__name__)
 
+WECHAT_IMG_RE = re.compile(r"微信图片_(\d{14})")
+TS_FORMAT = "%Y%m%d%H%M%S"
 
-class WxImageHandler(FileSystemEventHandler):
-    def __init__(self, image_queue: Queue):
-        self.image_queue = image_queue
 
-    def on_created(self, event):
-        if event.is_directory:
+def parse_image_ts(name: str):
+    """从文件名或路径中提取 14 位时间戳 YYYYMMDDHHMMSS，没有时返回 None"""
+    m = WECHAT_IMG_RE.search(name)
+    return m.group(1) if m else None
+
+
+def _neighbor_keys(ts: str, window: int):
+    """按时间距离从近到远返回 ±window 秒内的时间戳，跨分钟/跨天也正确"""
+    try:
+        base = datetime.strptime(ts, TS_FORMAT)
+    except ValueError:
+        return [ts]
+    keys = [ts]
+    for diff in range(1, window + 1):
+        keys.append((base - timedelta(seconds=diff)).strftime(TS_FORMAT))
+        keys.append((base + timedelta(seconds=diff)).strftime(TS_FORMAT))
+    return keys
+
+
+class WxImageIndex:
+    """
+    wxauto文件 目录的内存索引
+
+    按文件名中的 14 位时间戳分组保存 微信图片_* 文件，查找图片只需查字典，
+    不随目录中文件数量增长而变慢；图片尚未落盘时在对应时间戳上等待，
+    文件出现后立即唤醒，不再反复扫描目录。
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._files = {}      # 时间戳 -> {文件名: Path}，按首次出现的顺序
+        self._waiters = {}    # 时间戳（None 表示任意新文件） -> set[threading.Event]
+        self._lock = threading.Lock()
+        self.version = 0      # 每加入一个文件加一，用于等待“任意新图片”
+        self._recent = deque(maxlen=64)  # (version, Path)，最近加入的文件
+
+    def scan(self):
+        """启动时全量扫描一次目录，之后由 watchdog 事件增量维护"""
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file():
+                self.add(Path(entry.path))
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(files) for files in self._files.values())
+
+    def add(self, path: Path):
+        ts = parse_image_ts(path.name)
+        if not ts:
+            return
+        with self._lock:
+            files = self._files.setdefault(ts, {})
+            if path.name not in files:
+                files[path.name] = path
+                self.version += 1
+                self._recent.append((self.version, path))
+            for key in (ts, None):
+                for event in self._waiters.get(key, ()):
+                    event.set()
+
+    def discard(self, path: Path):
+        ts = parse_image_ts(path.name)
+        if not ts:
             return
+        with self._lock:
+            files = self._files.get(ts)
+            if files is not None:
+                files.pop(path.name, None)
+                if not files:
+                    del self._files[ts]
+
+    def find(self, ts: str, window: int = 2):
+        """
+        查找时间最接近 ts 且已写入内容的图片
 
-        path = Path(event.src_path)
+        Args:
+            ts: 14 位时间戳
+            window: 允许的时间误差（秒）
 
-        if path.name.startswith("微信图片_") and path.suffix.lower() == ".jpg":
-            # 等文件写完
-            time.sleep(0.2)
+        Returns:
+            Path | None
+        """
+        for key in _neighbor_keys(ts, window):
+            with self._lock:
+                # 同一秒内后落盘的优先
+                candidates = list(self._files.get(key, {}).values())[::-1]
+            for path in candidates:
+                try:
+                    if path.stat().st_size > 0:
+                        return path
+                except OSError:
+                    continue
+        return None
 
+    def latest_since(self, version: int):
+        """返回 version 之后加入的最新一个已写入内容的图片"""
+        with self._lock:
+            candidates = [path for v, path in self._recent if v > version]
+        for path in reversed(candidates):
             try:
-                if path.exists() and path.stat().st_size > 0:
-                    logger.warning(f"📸 捕获微信图片落盘: {path}")
-                    self.image_queue.put(str(path))
-            except Exception as e:
-                logger.error(f"处理图片事件失败: {e}")
+                if path.stat().st_size > 0:
+                    return path
+            except OSError:
+                continue
+        return None
+
+    def wait(self, ts: str = None, timeout: float = 10, window: int = 2):
+        """
+        等待图片落盘
+
+        Args:
+            ts: 14 位时间戳；为 None 时等待调用之后出现的任意新图片
+            timeout: 最长等待秒数
+            window: 允许的时间误差（秒）
+
+        Returns:
+            Path | None: 超时返回 None
+        """
+        keys = _neighbor_keys(ts, window) if ts else [None]
+        event = threading.Event()
+        with self._lock:
+            version = self.version
+            for key in keys:
+                self._waiters.setdefault(key, set()).add(event)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                path = self.find(ts, window) if ts else self.latest_since(version)
+                if path:
+                    return path
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                # 文件刚创建时可能还是空的，写入后的 modified 事件会再次唤醒
+                event.wait(remaining)
+                event.clear()
+        finally:
+            with self._lock:
+                for key in keys:
+                    waiters = self._waiters.get(key)
+                    if waiters is not None:
+                        waiters.discard(event)
+                        if not waiters:
+                            del self._waiters[key]
+
+
+class WxImageHandler(FileSystemEventHandler):
+    def __init__(self, index: WxImageIndex):
+        self.index = index
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.index.add(Path(event.src_path))
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.index.add(Path(event.src_path))
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.index.discard(Path(event.src_path))
+            self.index.add(Path(event.dest_path))
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.index.discard(Path(event.src_path))
 
 
 class WxImageWatcher:
     def __init__(self, watch_dir: Path):
-        self.watch_dir = watch_dir
-        self.queue = Queue()
+        self.watch_dir = Path(watch_dir)
+        self.index = WxImageIndex(self.watch_dir)
         self.observer = Observer()
 
     def start(self):
-        handler = WxImageHandler(self.queue)
+        self.watch_dir.mkdir(parents=True, exist_ok=True)
+        handler = WxImageHandler(self.index)
+        # 先订阅再扫描，扫描期间落盘的文件不会漏掉
         self.observer.schedule(handler, str(self.watch_dir), recursive=False)
         self.observer.start()
+        self.index.scan()
 
-        logger.warning(f"👀 watchdog 正在监听目录: {self.watch_dir}")
+        logger.warning(f"👀 watchdog 正在监听目录: {self.watch_dir}，已索引 {len(self.index)} 张图片")
 
     def stop(self):
         self.observer.stop()
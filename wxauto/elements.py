@@ -4,18 +4,25 @@ from .utils import *
 from .color import *
 from .errors import *
 import datetime
+import threading
+import weakref
 import time
 import os
 import re
 
 
 
+# 鼠标、键盘、剪贴板是全局资源，多个线程操作微信窗口时用它串行化
+UI_INPUT_LOCK = threading.RLock()
+
 class WxParam:
     SYS_TEXT_HEIGHT = 33
     TIME_TEXT_HEIGHT = 34
     RECALL_TEXT_HEIGHT = 45
     CHAT_TEXT_HEIGHT = 52
     CHAT_IMG_HEIGHT = 117
+    SEEN_MSGID_LIMIT = 500
+    CHAT_ICON_BADGE_REGION = None  # 新消息红点检测区域，相对聊天图标的比例 (left, top, right, bottom)，None 为整个图标
     DEFALUT_SAVEPATH = os.path.join(os.getcwd(), 'wxauto文件')
 
 class WeChatBase:
@@ -26,47 +33,117 @@ class WeChatBase:
             return WARNING[text][self.language]
 
     def _split(self, MsgItem):
-        uia.SetGlobalSearchTimeout(0)
-        MsgItemName = MsgItem.Name
-        if MsgItem.BoundingRectangle.height() == WxParam.SYS_TEXT_HEIGHT:
-            Msg = ['SYS', MsgItemName, ''.join([str(i) for i in MsgItem.GetRuntimeId()])]
-        elif MsgItem.BoundingRectangle.height() == WxParam.TIME_TEXT_HEIGHT:
-            Msg = ['Time', MsgItemName, ''.join([str(i) for i in MsgItem.GetRuntimeId()])]
-        elif MsgItem.BoundingRectangle.height() == WxParam.RECALL_TEXT_HEIGHT:
-            if '撤回' in MsgItemName:
-                Msg = ['Recall', MsgItemName, ''.join([str(i) for i in MsgItem.GetRuntimeId()])]
+        if isinstance(MsgItem, uia.CachedControl):
+            return self._split_cached(MsgItem)
+        with uia.SearchTimeout(0):
+            MsgItemName = MsgItem.Name
+            msgid = self._msgid(MsgItem)
+            if MsgItem.BoundingRectangle.height() == WxParam.SYS_TEXT_HEIGHT:
+                Msg = ['SYS', MsgItemName, msgid]
+            elif MsgItem.BoundingRectangle.height() == WxParam.TIME_TEXT_HEIGHT:
+                Msg = ['Time', MsgItemName, msgid]
+            elif MsgItem.BoundingRectangle.height() == WxParam.RECALL_TEXT_HEIGHT:
+                if '撤回' in MsgItemName:
+                    Msg = ['Recall', MsgItemName, msgid]
+                else:
+                    Msg = ['SYS', MsgItemName, msgid]
             else:
-                Msg = ['SYS', MsgItemName, ''.join([str(i) for i in MsgItem.GetRuntimeId()])]
-        else:
-            Index = 1
-            User = MsgItem.ButtonControl(foundIndex=Index)
-            try:
-                while True:
-                    if User.Name == '':
-                        Index += 1
-                        User = MsgItem.ButtonControl(foundIndex=Index)
+                Index = 1
+                User = MsgItem.ButtonControl(foundIndex=Index)
+                try:
+                    while True:
+                        if User.Name == '':
+                            Index += 1
+                            User = MsgItem.ButtonControl(foundIndex=Index)
+                        else:
+                            break
+                    winrect = MsgItem.BoundingRectangle
+                    mid = (winrect.left + winrect.right)/2
+                    if User.BoundingRectangle.left < mid:
+                        if MsgItem.TextControl().Exists(0.1) and MsgItem.TextControl().BoundingRectangle.top < User.BoundingRectangle.top:
+                            name = (User.Name, MsgItem.TextControl().Name)
+                        else:
+                            name = (User.Name, User.Name)
                     else:
-                        break
+                        name = 'Self'
+                    Msg = [name, MsgItemName, msgid]
+                except:
+                    Msg = ['SYS', MsgItemName, msgid]
+        return ParseMessage(Msg, MsgItem, self)
+    
+    def _split_cached(self, MsgItem):
+        """与 _split 相同的分类规则，但全部基于缓存属性，不产生跨进程调用"""
+        MsgItemName = MsgItem.Name
+        msgid = MsgItem.RuntimeKey
+        height = MsgItem.BoundingRectangle.height()
+        if height == WxParam.SYS_TEXT_HEIGHT:
+            Msg = ['SYS', MsgItemName, msgid]
+        elif height == WxParam.TIME_TEXT_HEIGHT:
+            Msg = ['Time', MsgItemName, msgid]
+        elif height == WxParam.RECALL_TEXT_HEIGHT:
+            Msg = ['Recall' if '撤回' in MsgItemName else 'SYS', MsgItemName, msgid]
+        else:
+            descendants = MsgItem.GetDescendants()
+            User = next((i for i in descendants if i.ControlType == uia.ControlType.ButtonControl and i.Name), None)
+            if User is None:
+                Msg = ['SYS', MsgItemName, msgid]
+            else:
                 winrect = MsgItem.BoundingRectangle
                 mid = (winrect.left + winrect.right)/2
                 if User.BoundingRectangle.left < mid:
-                    if MsgItem.TextControl().Exists(0.1) and MsgItem.TextControl().BoundingRectangle.top < User.BoundingRectangle.top:
-                        name = (User.Name, MsgItem.TextControl().Name)
+                    Text = next((i for i in descendants if i.ControlType == uia.ControlType.TextControl), None)
+                    if Text is not None and Text.BoundingRectangle.top < User.BoundingRectangle.top:
+                        name = (User.Name, Text.Name)
                     else:
                         name = (User.Name, User.Name)
                 else:
                     name = 'Self'
-                Msg = [name, MsgItemName, ''.join([str(i) for i in MsgItem.GetRuntimeId()])]
-            except:
-                Msg = ['SYS', MsgItemName, ''.join([str(i) for i in MsgItem.GetRuntimeId()])]
-        uia.SetGlobalSearchTimeout(10.0)
+                Msg = [name, MsgItemName, msgid]
         return ParseMessage(Msg, MsgItem, self)
-    
+
+    def _msgitems(self):
+        """获取消息列表的所有子项
+
+        优先通过一次 FindAllBuildCache 批量获取整个消息列表子树的 Name、BoundingRectangle、
+        RuntimeId、ControlType，后续分类只读缓存；失败时退回逐个控件访问
+        """
+        try:
+            return self.C_MsgList.FindAllBuildCache(
+                uia.TreeScope.Children,
+                uia.CreateCacheRequest(treeScope=uia.TreeScope.Subtree)
+            )
+        except Exception as e:
+            wxlog.debug(f'批量获取消息缓存失败，退回逐项获取：{e}')
+            return self.C_MsgList.GetChildren()
+
+    @staticmethod
+    def _msgid(MsgItem):
+        """消息ID：RuntimeId 元组，可哈希且不会像拼接字符串那样把 [1, 23] 和 [12, 3] 混为一谈"""
+        if isinstance(MsgItem, uia.CachedControl):
+            return MsgItem.RuntimeKey
+        return tuple(MsgItem.GetRuntimeId())
+
+    def _msgids(self, msgitems):
+        return [self._msgid(MsgItem) for MsgItem in msgitems]
+
+    def _newtail(self, msgitems, msgids):
+        """从底部找到最后一条已记录的消息，返回它之后的消息项
+
+        Args:
+            msgitems (list): 消息列表的子项，通常来自 _msgitems
+            msgids (list): 与 msgitems 一一对应的消息ID
+
+        Returns:
+            list: 新消息项（只保留 ListItemControl）；窗口内没有任何已记录消息（如已切换聊天）时返回 None
+        """
+        for i in range(len(msgids) - 1, -1, -1):
+            if msgids[i] in self.usedmsgid:
+                return [item for item in msgitems[i+1:] if item.ControlTypeName == 'ListItemControl']
+        return None
+
     def _getmsgs(self, msgitems, savepic=False, savefile=False, savevoice=False):
-        msgs = []
-        for MsgItem in msgitems:
-            if MsgItem.ControlTypeName == 'ListItemControl':
-                msgs.append(self._split(MsgItem))
+        msgitems = [i for i in msgitems if i.ControlTypeName == 'ListItemControl']
+        msgs = [self._split(MsgItem) for MsgItem in msgitems]
 
         msgtypes = [
             f"[{self._lang('图片')}]",
@@ -77,21 +154,31 @@ class WeChatBase:
         if not [i for i in msgs if i.content[:4] in msgtypes]:
             return msgs
 
-        for msg in msgs:
+        for index, (msg, MsgItem) in enumerate(zip(msgs, msgitems)):
             if msg.type not in ('friend', 'self'):
                 continue
-            if msg.content.startswith(f"[{self._lang('图片')}]") and savepic:
-                imgpath = self._download_pic(msg.control)
-                msg.content = imgpath if imgpath else msg.content
-            elif msg.content.startswith(f"[{self._lang('文件')}]") and savefile:
-                filepath = self._download_file(msg.control)
-                msg.content = filepath if filepath else msg.content
-            elif msg.content.startswith(f"[{self._lang('语音')}]") and savevoice:
-                self._show()
-                voice_text = self._get_voice_text(msg.control)
-                msg.content = voice_text if voice_text else msg.content
-            msg.info[1] = msg.content
+            control = MsgItem.Control if isinstance(MsgItem, uia.CachedControl) else MsgItem
+            content = None
+            # 下载需要点击菜单和使用剪贴板，多线程轮询时必须串行
+            with UI_INPUT_LOCK:
+                if msg.content.startswith(f"[{self._lang('图片')}]") and savepic:
+                    content = self._download_pic(control)
+                elif msg.content.startswith(f"[{self._lang('文件')}]") and savefile:
+                    content = self._download_file(control)
+                elif msg.content.startswith(f"[{self._lang('语音')}]") and savevoice:
+                    self._show()
+                    content = self._get_voice_text(control)
+            if content:
+                msgs[index] = msg._replace(content=content)
         return msgs
+
+    def _find_msgitem(self, runtimeid):
+        """按 RuntimeId 在当前消息列表中查找消息控件"""
+        runtimeid = tuple(runtimeid)
+        for MsgItem in self._msgitems():
+            if self._msgid(MsgItem) == runtimeid:
+                return MsgItem.Control if isinstance(MsgItem, uia.CachedControl) else MsgItem
+        raise MessageNotFoundError('消息已不在当前消息列表中')
     
     def _download_pic(self, msgitem):
         self._show()
@@ -179,14 +266,19 @@ class WeChatBase:
 
 
 class ChatWnd(WeChatBase):
-    def __init__(self, who, language='cn'):
+    def __init__(self, who, language='cn', usedmsgid=None):
         self.who = who
         self.language = language
-        self.usedmsgid = []
         self.UiaAPI = uia.WindowControl(searchDepth=1, ClassName='ChatWnd', Name=who)
         self.editbox = self.UiaAPI.EditControl()
         self.C_MsgList = self.UiaAPI.ListControl()
-        self.GetAllMessage()
+        if usedmsgid is not None:
+            # 与同一聊天的其他窗口对象（如并行轮询线程中的副本）共用已处理ID，不重新记录
+            self.usedmsgid = usedmsgid
+        else:
+            self.usedmsgid = SeenMessageIndex(WxParam.SEEN_MSGID_LIMIT)
+            # 只记录当前已加载消息的ID，无需逐条解析
+            self.usedmsgid.update(self._msgids(self._msgitems()))
 
         self.savepic = False   # 该参数用于在自动监听的情况下是否自动保存聊天图片
 
@@ -312,7 +404,7 @@ class ChatWnd(WeChatBase):
             list: 聊天记录信息
         '''
         wxlog.debug(f"获取所有聊天记录：{self.who}")
-        MsgItems = self.C_MsgList.GetChildren()
+        MsgItems = self._msgitems()
         msgs = self._getmsgs(MsgItems, savepic, savefile, savevoice)
         return msgs
     
@@ -328,15 +420,18 @@ class ChatWnd(WeChatBase):
             list: 新聊天记录信息
         '''
         wxlog.debug(f"获取新聊天记录：{self.who}")
+        MsgItems = self._msgitems()
+        msgids = self._msgids(MsgItems)
         if not self.usedmsgid:
-            self.usedmsgid = [i[-1] for i in self.GetAllMessage()]
+            self.usedmsgid.update(msgids)
             return []
-        MsgItems = self.C_MsgList.GetChildren()
-        NewMsgItems = [i for i in MsgItems if ''.join([str(i) for i in i.GetRuntimeId()]) not in self.usedmsgid]
+        NewMsgItems = [item for item, msgid in zip(MsgItems, msgids) if msgid not in self.usedmsgid]
         if not NewMsgItems:
+            self.usedmsgid.update(msgids)
             return []
         newmsgs = self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
-        self.usedmsgid = [i[-1] for i in self._getmsgs(MsgItems)]
+        # 解析成功后再记录可见窗口的全部ID；解析中途出错时下次轮询仍会返回这些消息
+        self.usedmsgid.update(msgids)
         # if newmsgs[0].type == 'sys' and newmsgs[0].content == self._lang('查看更多消息'):
         #     newmsgs = newmsgs[1:]
         return newmsgs
@@ -376,23 +471,19 @@ class ChatWnd(WeChatBase):
         wxlog.debug(f"获取当前聊天群成员：{self.who}")
         ele = self.UiaAPI.PaneControl(searchDepth=7, foundIndex=6).ButtonControl(Name='聊天信息')
         try:
-            uia.SetGlobalSearchTimeout(1)
-            rect = ele.BoundingRectangle
+            with uia.SearchTimeout(1):
+                rect = ele.BoundingRectangle
             Click(rect)
         except:
             return 
-        finally:
-            uia.SetGlobalSearchTimeout(10)
         roominfoWnd = self.UiaAPI.WindowControl(ClassName='SessionChatRoomDetailWnd', searchDepth=1)
         more = roominfoWnd.ButtonControl(Name='查看更多', searchDepth=8)
         try:
-            uia.SetGlobalSearchTimeout(1)
-            rect = more.BoundingRectangle
+            with uia.SearchTimeout(1):
+                rect = more.BoundingRectangle
             Click(rect)
         except:
             pass
-        finally:
-            uia.SetGlobalSearchTimeout(10)
         members = [i.Name for i in roominfoWnd.ListControl(Name='聊天成员').GetChildren()]
         while members[-1] in ['添加', '移出']:
             members = members[:-1]
@@ -680,9 +771,124 @@ class SessionElement:
         wxlog.debug(f"是否有新消息: {self.isnew}")
 
 
+class SessionIndex:
+    """聊天列表索引
+
+    记录聊天列表中可见会话的 名称 -> (控件, 控件Name) 映射和新消息条数。
+    刷新时通过一次 FindAllBuildCache 读取所有会话项的 Name、位置和 RuntimeId，
+    只有 Name 发生变化（新会话、新消息条数变化、控件被复用）的会话项才重新解析名称和条数。
+    """
+    MAX_ITEMS = 100
+
+    def __init__(self, parse):
+        """
+        Args:
+            parse (function): 解析会话项的函数 parse(SessionItem) -> (sessionname, amount)
+        """
+        self.parse = parse
+        self.controls = {}
+        self.amounts = {}
+        self._parsed = {}
+        self._listrect = None
+
+    def _items(self, sessionlist):
+        try:
+            items = sessionlist.FindAllBuildCache(uia.TreeScope.Children, uia.CreateCacheRequest())
+        except Exception as e:
+            wxlog.debug(f'批量获取聊天列表缓存失败，退回逐项获取：{e}')
+            items = sessionlist.GetChildren()
+        return items[:self.MAX_ITEMS]
+
+    def refresh(self, sessionlist):
+        """重新读取聊天列表
+
+        Args:
+            sessionlist (uiautomation.ListControl): 聊天列表控件
+
+        Returns:
+            dict: 聊天对象名 -> 新消息条数，按列表顺序
+        """
+        self._listrect = sessionlist.BoundingRectangle
+        controls, amounts, parsed = {}, {}, {}
+        for item in self._items(sessionlist):
+            if item.ControlTypeName != 'ListItemControl' or item.BoundingRectangle.width() == 0:
+                continue
+            rawname = item.Name
+            key = WeChatBase._msgid(item)
+            cached = self._parsed.get(key)
+            if cached and cached[0] == rawname:
+                name, amount = cached[1], cached[2]
+            else:
+                control = item.Control if isinstance(item, uia.CachedControl) else item
+                try:
+                    name, amount = self.parse(control)
+                except:
+                    break
+            parsed[key] = (rawname, name, amount)
+            if name in controls:
+                continue
+            controls[name] = (item.Control if isinstance(item, uia.CachedControl) else item, rawname)
+            amounts[name] = amount
+        self.controls, self.amounts, self._parsed = controls, amounts, parsed
+        return dict(amounts)
+
+    def get(self, name):
+        """返回完整显示在聊天列表中的会话控件，会话已移动、被遮挡或未记录时返回 None
+
+        只读取该控件自身的 Name 和位置校验是否仍是同一个会话，不重新扫描整个列表
+        """
+        if name not in self.controls or self._listrect is None:
+            return None
+        control, rawname = self.controls[name]
+        try:
+            if control.Name != rawname:
+                return None
+            rect = control.BoundingRectangle
+        except Exception:
+            return None
+        if rect.width() == 0 or rect.top < self._listrect.top or rect.bottom > self._listrect.bottom:
+            return None
+        return control
+
+    def clear(self):
+        self.controls.clear()
+        self.amounts.clear()
+        self._parsed.clear()
+        self._listrect = None
+
+
 class Message:
+    """消息记录
+
+    不可变、使用 __slots__ 的轻量对象，只保存类型、发送者、备注、内容和 RuntimeId，
+    不持有 UIA 控件；quote/forward/parse 等需要控件时再按 RuntimeId 从消息列表中查找。
+    对所属窗口只保存弱引用，不会延长窗口对象的生命周期。
+
+    id 为消息控件 RuntimeId 组成的整数元组（tuple[int, ...]），可哈希、可直接比较；
+    旧版本中 id 是把 RuntimeId 拼接成的字符串，依赖字符串的调用方需要改用元组。
+    """
+    __slots__ = ('sender', 'sender_remark', 'content', 'id', '_winref')
     type = 'message'
 
+    def __init__(self, info, control, wx):
+        sender = info[0]
+        if isinstance(sender, tuple):
+            sender, sender_remark = sender
+        else:
+            sender_remark = sender
+        _set = object.__setattr__
+        _set(self, 'sender', sender)
+        _set(self, 'sender_remark', sender_remark)
+        _set(self, 'content', info[1])
+        _set(self, 'id', info[-1])
+        _set(self, '_winref', weakref.ref(wx) if wx is not None else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} 是不可变对象，请使用 _replace')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} 是不可变对象')
+
     def __getitem__(self, index):
         return self.info[index]
     
@@ -691,18 +897,52 @@ class Message:
     
     def __repr__(self):
         return str(self.info[:2])
+
+    def _replace(self, **changes):
+        """返回修改了部分字段的新消息对象"""
+        new = object.__new__(type(self))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                object.__setattr__(new, name, changes.get(name, getattr(self, name)))
+        return new
+
+    @property
+    def info(self):
+        return [self.sender, self.content, self.id]
+
+    @property
+    def runtimeid(self):
+        """消息控件的 RuntimeId 元组，即消息ID"""
+        return self.id
+
+    @property
+    def _winobj(self):
+        winobj = self._winref() if self._winref is not None else None
+        if winobj is None:
+            raise MessageNotFoundError('消息所属窗口已释放')
+        return winobj
+
+    @property
+    def wx(self):
+        return self._winobj
+
+    @property
+    def chatbox(self):
+        obj = self._winobj
+        return obj.ChatBox if hasattr(obj, 'ChatBox') else obj.UiaAPI
+
+    @property
+    def control(self):
+        """按 RuntimeId 在消息列表中查找该消息对应的 UIA 控件"""
+        return self._winobj._find_msgitem(self.runtimeid)
     
 
 class SysMessage(Message):
+    __slots__ = ()
     type = 'sys'
     
     def __init__(self, info, control, wx):
-        self.info = info
-        self.control = control
-        self.wx = wx
-        self.sender = info[0]
-        self.content = info[1]
-        self.id = info[-1]
+        super().__init__(info, control, wx)
         wxlog.debug(f"【系统消息】{self.content}")
     
     # def __repr__(self):
@@ -710,32 +950,29 @@ class SysMessage(Message):
     
 
 class TimeMessage(Message):
+    __slots__ = ('time',)
     type = 'time'
     
     def __init__(self, info, control, wx):
-        self.info = info
-        self.control = control
-        self.wx = wx
-        self.time = ParseWeChatTime(info[1])
-        self.sender = info[0]
-        self.content = info[1]
-        self.id = info[-1]
+        super().__init__(info, control, wx)
+        object.__setattr__(self, 'time', ParseWeChatTime(info[1]))
         wxlog.debug(f"【时间消息】{self.time}")
+
+    @property
+    def dt(self):
+        """时间对应的 datetime 对象，无法识别时为 None"""
+        return ParseWeChatTime(self.content, as_datetime=True)
     
     # def __repr__(self):
     #     return f'<wxauto TimeMessage at {hex(id(self))}>'
     
 
 class RecallMessage(Message):
+    __slots__ = ()
     type = 'recall'
     
     def __init__(self, info, control, wx):
-        self.info = info
-        self.control = control
-        self.wx = wx
-        self.sender = info[0]
-        self.content = info[1]
-        self.id = info[-1]
+        super().__init__(info, control, wx)
         wxlog.debug(f"【撤回消息】{self.content}")
     
     # def __repr__(self):
@@ -743,16 +980,11 @@ class RecallMessage(Message):
     
 
 class SelfMessage(Message):
+    __slots__ = ()
     type = 'self'
     
     def __init__(self, info, control, obj):
-        self.info = info
-        self.control = control
-        self._winobj = obj
-        self.sender = info[0]
-        self.content = info[1]
-        self.id = info[-1]
-        self.chatbox = obj.ChatBox if hasattr(obj, 'ChatBox') else obj.UiaAPI
+        super().__init__(info, control, obj)
         wxlog.debug(f"【自己消息】{self.content}")
     
     # def __repr__(self):
@@ -849,18 +1081,11 @@ class SelfMessage(Message):
         return msgs
 
 class FriendMessage(Message):
+    __slots__ = ()
     type = 'friend'
     
     def __init__(self, info, control, obj):
-        self.info = info
-        self.control = control
-        self._winobj = obj
-        self.sender = info[0][0]
-        self.sender_remark = info[0][1]
-        self.content = info[1]
-        self.id = info[-1]
-        self.info[0] = info[0][0]
-        self.chatbox = obj.ChatBox if hasattr(obj, 'ChatBox') else obj.UiaAPI
+        super().__init__(info, control, obj)
         if self.sender == self.sender_remark:
             wxlog.debug(f"【好友消息】{self.sender}: {self.content}")
         else:
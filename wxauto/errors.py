@@ -2,5 +2,10 @@
 class TargetNotFoundError(Exception):
     pass
 
+
 class FriendNotFoundError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class MessageNotFoundError(Exception):
+    pass
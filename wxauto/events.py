@@ -0,0 +1,111 @@
+"""新消息事件通知
+
+本模块顶层只依赖标准库，UIA 只在 UIAMessageEventSource 订阅时导入，
+ListenEventHub 可以脱离 wxauto 包单独加载，在非 Windows 环境中配合假事件源测试
+"""
+import threading
+
+
+class UIAMessageEventSource:
+    """基于 UIA StructureChanged 事件的消息列表变化源
+
+    订阅聊天窗口消息列表(C_MsgList)自身及其子元素的结构变化，有新消息追加时回调通知。
+    ChildAdded 的发送者是新增的子元素，而 ChildrenInvalidated / ChildrenBulkAdded / ChildrenReordered
+    的发送者是消息列表本身，所以范围必须同时包含 Element 和 Children。
+    回调在 UIA 的事件线程中执行，只做标记，不访问任何控件。
+    """
+    # 视为“有新消息”的结构变化类型：ChildAdded / ChildrenInvalidated / ChildrenBulkAdded / ChildrenReordered
+    TRIGGER_TYPES = (0, 2, 3, 5)
+
+    def __init__(self):
+        self.handlers = {}
+
+    def subscribe(self, who, msglist, callback):
+        """订阅消息列表变化
+
+        Args:
+            who (str): 聊天对象名
+            msglist (uiautomation.ListControl): 聊天窗口的消息列表控件
+            callback (function): 有新消息时调用 callback(who)
+        """
+        from . import uiautomation as uia
+
+        def on_changed(change_type, runtime_id):
+            if change_type in self.TRIGGER_TYPES:
+                callback(who)
+
+        self.unsubscribe(who)
+        scope = uia.TreeScope.Element | uia.TreeScope.Children
+        handler = uia.AddStructureChangedEventHandler(msglist, on_changed, scope)
+        self.handlers[who] = (msglist, handler)
+
+    def unsubscribe(self, who):
+        """取消订阅"""
+        from . import uiautomation as uia
+        if who in self.handlers:
+            msglist, handler = self.handlers.pop(who)
+            try:
+                uia.RemoveStructureChangedEventHandler(msglist, handler)
+            except Exception:
+                pass
+
+    def close(self):
+        for who in list(self.handlers):
+            self.unsubscribe(who)
+
+
+class ListenEventHub:
+    """监听对象的新消息通知中心
+
+    事件源通知某个聊天有变化后记录为“待检查”，监听线程通过 wait 阻塞等待，
+    没有事件时线程挂起不占用 CPU，只在超时后做一次兜底轮询。
+
+    事件源只需实现 subscribe(who, msglist, callback) / unsubscribe(who) / close()，
+    测试时可以传入不依赖 UIA 的假事件源，直接调用 callback 模拟新消息。
+    """
+
+    def __init__(self, source=None):
+        self.source = source if source is not None else UIAMessageEventSource()
+        self._watched = set()
+        self._dirty = set()
+        self._cond = threading.Condition()
+
+    def watch(self, chat):
+        """订阅聊天窗口（ChatWnd）的新消息事件"""
+        with self._cond:
+            self._watched.add(chat.who)
+        self.source.subscribe(chat.who, chat.C_MsgList, self.notify)
+
+    def unwatch(self, who):
+        self.source.unsubscribe(who)
+        with self._cond:
+            self._watched.discard(who)
+            self._dirty.discard(who)
+
+    def notify(self, who):
+        """标记某个聊天有新消息，可在任意线程调用；已取消订阅的聊天迟到的事件会被忽略"""
+        with self._cond:
+            if who not in self._watched:
+                return
+            self._dirty.add(who)
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """等待新消息事件
+
+        Args:
+            timeout (float, optional): 最长等待秒数
+
+        Returns:
+            set: 有新消息的聊天对象名；超时返回空集合
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._dirty, timeout)
+            dirty, self._dirty = self._dirty, set()
+        return dirty
+
+    def close(self):
+        self.source.close()
+        with self._cond:
+            self._watched.clear()
+            self._dirty.clear()
@@ -0,0 +1,68 @@
+"""新消息红点的像素判断
+
+只依赖标准库和可选的 numpy，不导入 UIA/win32，可以脱离 wxauto 包单独加载，
+在非 Windows 环境中用合成图片测试和做基准
+"""
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时退回逐像素判断
+    np = None
+
+
+_red_pixel_buffers = threading.local()
+
+def _red_masks(shape):
+    """按图片尺寸复用的布尔缓冲区，每个线程一份，避免每次判断都重新分配"""
+    masks = getattr(_red_pixel_buffers, 'masks', None)
+    if masks is None or masks[0].shape != shape:
+        masks = (np.empty(shape, dtype=bool), np.empty(shape, dtype=bool))
+        _red_pixel_buffers.masks = masks
+    return masks
+
+def _has_red_pixel_loop(img):
+    """逐像素判断，未安装 numpy 时使用"""
+    return any(p[0] > p[1] and p[0] > p[2] for p in img.getdata())
+
+def HasRedPixel(img):
+    """图片中是否存在偏红像素（R 同时大于 G 和 B）
+
+    Args:
+        img (PIL.Image.Image): 待检测图片
+
+    Returns:
+        bool: 存在偏红像素返回 True
+    """
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if np is None:
+        return _has_red_pixel_loop(img)
+    arr = np.asarray(img)
+    if not arr.size:
+        return False
+    red_gt_green, red_gt_blue = _red_masks(arr.shape[:2])
+    np.greater(arr[..., 0], arr[..., 1], out=red_gt_green)
+    np.greater(arr[..., 0], arr[..., 2], out=red_gt_blue)
+    np.logical_and(red_gt_green, red_gt_blue, out=red_gt_green)
+    return bool(red_gt_green.any())
+
+def BadgeBox(rect, region=None):
+    """计算截图区域
+
+    Args:
+        rect: 控件的 BoundingRectangle，需要 left / top / right / bottom 属性
+        region (tuple, optional): 控件内的子区域 (left, top, right, bottom)，取值为 0~1 的比例；默认整个控件
+
+    Returns:
+        tuple: ImageGrab.grab 使用的 bbox
+    """
+    if not region:
+        return (rect.left, rect.top, rect.right, rect.bottom)
+    width, height = rect.right - rect.left, rect.bottom - rect.top
+    return (
+        rect.left + int(width * region[0]),
+        rect.top + int(height * region[1]),
+        rect.left + int(width * region[2]),
+        rect.top + int(height * region[3]),
+    )
@@ -0,0 +1,132 @@
+from . import uiautomation as uia
+from .elements import ChatWnd
+from .utils import wxlog
+from concurrent.futures import Future, wait
+import threading
+import weakref
+import queue
+
+
+class _PollWorker(threading.Thread):
+    """轮询线程，初始化自己的 COM 环境，并持有分配给它的聊天窗口副本
+
+    UIA 控件只在创建它的线程中使用，所以每个聊天固定由同一个线程轮询，
+    副本与主线程的 ChatWnd 共用已处理消息ID（usedmsgid），不会重复返回消息；
+    返回的消息绑定到主线程的 ChatWnd，quote/forward 等操作在调用方线程中用调用方的控件执行
+    """
+
+    def __init__(self, name):
+        super().__init__(name=name, daemon=True)
+        self.jobs = queue.Queue()
+        self.chats = {}
+
+    def run(self):
+        uia.InitializeUIAutomationInCurrentThread()
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                chat, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(self._poll(chat))
+                except BaseException as e:
+                    # 出错的窗口副本丢弃，下次轮询时重建
+                    self.chats.pop(chat.who, None)
+                    future.set_exception(e)
+        finally:
+            self.chats.clear()
+            uia.UninitializeUIAutomationInCurrentThread()
+
+    def _poll(self, chat):
+        local = self.chats.get(chat.who)
+        if local is None:
+            local = self.chats[chat.who] = ChatWnd(chat.who, chat.language, usedmsgid=chat.usedmsgid)
+        else:
+            # 重新添加监听后主线程的 ChatWnd 会换新，这里每次都跟随它的已处理ID
+            local.usedmsgid = chat.usedmsgid
+        msgs = local.GetNewMessage(savepic=chat.savepic, savefile=chat.savefile, savevoice=chat.savevoice)
+        # 副本的控件属于本线程且随时可能重建，消息改为引用主线程的 ChatWnd，
+        # 需要控件时按 RuntimeId 在调用方自己的消息列表中查找
+        owner = weakref.ref(chat)
+        return [msg._replace(_winref=owner) for msg in msgs]
+
+
+class ChatPollPool:
+    """并行轮询多个独立聊天窗口的线程池
+
+    线程数有上限，聊天按添加顺序轮流分配给各线程并固定下来；
+    单个窗口出错只记录日志并跳过，不影响其它窗口的结果
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max(1, int(max_workers))
+        self.workers = []
+        self.assigned = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _worker(self, who):
+        with self._lock:
+            worker = self.assigned.get(who)
+            if worker is None:
+                if len(self.workers) < self.max_workers:
+                    worker = _PollWorker(f'wxauto-poll-{len(self.workers)}')
+                    worker.start()
+                    self.workers.append(worker)
+                else:
+                    worker = self.workers[len(self.assigned) % self.max_workers]
+                self.assigned[who] = worker
+            return worker
+
+    def poll(self, chats, timeout=None):
+        """并行获取多个聊天窗口的新消息
+
+        Args:
+            chats (list): 要轮询的 ChatWnd 列表
+            timeout (float, optional): 最长等待秒数，超时仍在执行的窗口结果留到下一轮返回
+
+        Returns:
+            dict: {ChatWnd: [消息]}，与 WeChat.GetListenMessage 相同
+        """
+        futures = {}
+        for chat in chats:
+            # 上一轮超时仍在执行的窗口不重复提交，直接等待它的结果
+            future = self._pending.pop(chat.who, None)
+            if future is None:
+                future = Future()
+                self._worker(chat.who).jobs.put((chat, future))
+            futures[future] = chat
+        wait(futures, timeout)
+        msgs = {}
+        for future, chat in futures.items():
+            if not future.done():
+                # 未开始的直接取消；已在执行的会更新已处理ID，结果必须留到下一轮，否则消息会丢失
+                if not future.cancel():
+                    self._pending[chat.who] = future
+                wxlog.debug(f'轮询 {chat.who} 超时，本轮跳过')
+                continue
+            try:
+                msg = future.result()
+            except Exception as e:
+                wxlog.debug(f'轮询 {chat.who} 出错：{e}')
+                continue
+            if msg:
+                msgs[chat] = msg
+        return msgs
+
+    def discard(self, who):
+        """移除聊天的线程分配"""
+        with self._lock:
+            self.assigned.pop(who, None)
+            self._pending.pop(who, None)
+
+    def close(self):
+        with self._lock:
+            workers, self.workers = self.workers, []
+            self.assigned.clear()
+            self._pending.clear()
+        for worker in workers:
+            worker.jobs.put(None)
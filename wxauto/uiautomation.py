@@ -20,6 +20,7 @@ import re
 import threading
 import ctypes
 import ctypes.wintypes
+import collections
 import comtypes #need pip install comtypes
 import comtypes.client
 from PIL import ImageGrab
@@ -36,6 +37,8 @@ OPERATION_WAIT_TIME = 0.5
 MAX_PATH = 260
 DEBUG_SEARCH_TIME = False
 DEBUG_EXIST_DISAPPEAR = False
+LOCATOR_CACHE_ENABLED = True  # reuse found elements in Control.Exists, see `LocatorCache`
+LOCATOR_CACHE_SIZE = 1024  # max cached locators per thread
 S_OK = 0
 
 IsNT6orHigher = os.sys.getwindowsversion().major >= 6
@@ -830,6 +833,32 @@ class NavigateDirection:
     LastChild = 4
 
 
+class TreeScope:
+    """
+    TreeScope from IUIAutomation.
+    Refer https://docs.microsoft.com/en-us/windows/win32/api/uiautomationclient/ne-uiautomationclient-treescope
+    """
+    Element = 1
+    Children = 2
+    Descendants = 4
+    Parent = 8
+    Ancestors = 16
+    Subtree = 7
+
+
+class StructureChangeType:
+    """
+    StructureChangeType from IUIAutomation.
+    Refer https://docs.microsoft.com/en-us/windows/win32/api/uiautomationcore/ne-uiautomationcore-structurechangetype
+    """
+    ChildAdded = 0
+    ChildRemoved = 1
+    ChildrenInvalidated = 2
+    ChildrenBulkAdded = 3
+    ChildrenBulkRemoved = 4
+    ChildrenReordered = 5
+
+
 class DockPosition:
     """
     DockPosition from IUIAutomation.
@@ -5367,7 +5396,15 @@ class Control():
                 ControlTypeNames[v] if k == 'ControlType' else repr(v)) for k, v in self.searchProperties.items()]
         return '{' + ', '.join(strs) + '}'
 
-    #BuildUpdatedCache
+    def BuildUpdatedCache(self, cacheRequest) -> 'CachedControl':
+        """
+        Call IUIAutomationElement::BuildUpdatedCache.
+        cacheRequest: `ctypes.POINTER(IUIAutomationCacheRequest)`, see `CreateCacheRequest`.
+        Return `CachedControl`, a snapshot of the cached properties of this control (and its cached subtree).
+        Refer https://docs.microsoft.com/en-us/windows/win32/api/uiautomationclient/nf-uiautomationclient-iuiautomationelement-buildupdatedcache
+        """
+        return CachedControl(self.Element.BuildUpdatedCache(cacheRequest))
+
     #CachedAcceleratorKey
     #CachedAccessKey
     #CachedAriaProperties
@@ -5693,7 +5730,20 @@ class Control():
         return self.Element.CurrentProviderDescription
 
     #FindAll
-    #FindAllBuildCache
+
+    def FindAllBuildCache(self, scope: int, cacheRequest) -> List['CachedControl']:
+        """
+        Call IUIAutomationElement::FindAllBuildCache with a raw view condition,
+        fetch all elements in scope together with their cached properties in one cross-process call.
+        scope: int, a value in class `TreeScope`, usually TreeScope.Children.
+        cacheRequest: `ctypes.POINTER(IUIAutomationCacheRequest)`, see `CreateCacheRequest`.
+        Return List[CachedControl].
+        Refer https://docs.microsoft.com/en-us/windows/win32/api/uiautomationclient/nf-uiautomationclient-iuiautomationelement-findallbuildcache
+        """
+        condition = _AutomationClient.instance().IUIAutomation.RawViewCondition
+        elementArray = self.Element.FindAllBuildCache(scope, condition, cacheRequest)
+        return CachedControl.FromElementArray(elementArray)
+
     #FindFirst
     #FindFirstBuildCache
     #GetCachedChildren
@@ -5785,7 +5835,7 @@ class Control():
         Return `ctypes.POINTER(IUIAutomationElement)`.
         """
         if not self._element:
-            self.Refind(maxSearchSeconds=TIME_OUT_SECOND, searchIntervalSeconds=self.searchInterval)
+            self.Refind(maxSearchSeconds=GetSearchTimeout(), searchIntervalSeconds=self.searchInterval)
         return self._element
 
     @property
@@ -6027,6 +6077,16 @@ class Control():
             if printIfNotExist or DEBUG_EXIST_DISAPPEAR:
                 Logger.ColorfullyLog(self.GetColorfulSearchPropertiesStr() + '<Color=Red> does not exist.</Color>')
             return False
+        cacheKey = LocatorCache.Key(self) if LOCATOR_CACHE_ENABLED else None
+        if cacheKey:
+            element = LocatorCache.Get(cacheKey, self)
+            if element:
+                self._element = element
+                self.traverseCount = 0
+                if DEBUG_SEARCH_TIME:
+                    Logger.ColorfullyLog('{} TraverseControls: <Color=Cyan>0</Color> (locator cache hit), {}'.format(
+                        self.GetColorfulSearchPropertiesStr(), LocatorCache.Stats()))
+                return True
         startTime2 = ProcessTime()
         if DEBUG_SEARCH_TIME:
             startDateTime = datetime.datetime.now()
@@ -6034,7 +6094,10 @@ class Control():
             control = FindControl(self.searchFromControl, self._CompareFunction, self.searchDepth, False, self.foundIndex)
             if control:
                 self._element = control.Element
+                self.traverseCount = control.traverseCount
                 control._element = 0  # control will be destroyed, but the element needs to be stroed in self._element
+                if cacheKey:
+                    LocatorCache.Put(cacheKey, self._element, control.traverseCount)
                 if DEBUG_SEARCH_TIME:
                     Logger.ColorfullyLog('{} TraverseControls: <Color=Cyan>{}</Color>, SearchTime: <Color=Cyan>{:.3f}</Color>s[{} - {}]'.format(
                         self.GetColorfulSearchPropertiesStr(), control.traverseCount, ProcessTime() - startTime2,
@@ -6073,14 +6136,16 @@ class Control():
                     Logger.ColorfullyLog(self.GetColorfulSearchPropertiesStr() + '<Color=Red> does not disappear.</Color>')
                 return False
 
-    def Refind(self, maxSearchSeconds: float = TIME_OUT_SECOND, searchIntervalSeconds: float = SEARCH_INTERVAL, raiseException: bool = True) -> bool:
+    def Refind(self, maxSearchSeconds: float = None, searchIntervalSeconds: float = SEARCH_INTERVAL, raiseException: bool = True) -> bool:
         """
         Refind the control every searchIntervalSeconds seconds in maxSearchSeconds seconds.
-        maxSearchSeconds: float.
+        maxSearchSeconds: float, if None, use `GetSearchTimeout()` of the current thread.
         searchIntervalSeconds: float.
         raiseException: bool, if True, raise a LookupError if timeout.
         Return bool, True if find.
         """
+        if maxSearchSeconds is None:
+            maxSearchSeconds = GetSearchTimeout()
         if not self.Exists(maxSearchSeconds, searchIntervalSeconds, False if raiseException else DEBUG_EXIST_DISAPPEAR):
             if raiseException:
                 # Logger.ColorfullyLog('<Color=Red>Find Control Timeout: </Color>' + self.GetColorfulSearchPropertiesStr())
@@ -7540,6 +7605,94 @@ ControlConstructors = {
 }
 
 
+def CreateCacheRequest(propertyIds: Iterable[int] = None, treeScope: int = TreeScope.Element) -> Any:
+    """
+    Create an IUIAutomationCacheRequest on the raw view.
+    propertyIds: Iterable[int], values in class `PropertyId`, default is `CachedControl.DefaultPropertyIds`.
+    treeScope: int, a value in class `TreeScope`, TreeScope.Subtree caches the whole subtree of every found element.
+    Return `ctypes.POINTER(IUIAutomationCacheRequest)`.
+    Refer https://docs.microsoft.com/en-us/windows/win32/api/uiautomationclient/nn-uiautomationclient-iuiautomationcacherequest
+    """
+    client = _AutomationClient.instance()
+    cacheRequest = client.IUIAutomation.CreateCacheRequest()
+    for propertyId in (propertyIds or CachedControl.DefaultPropertyIds):
+        cacheRequest.AddProperty(propertyId)
+    cacheRequest.TreeScope = treeScope
+    cacheRequest.TreeFilter = client.IUIAutomation.RawViewCondition
+    return cacheRequest
+
+
+class CachedControl():
+    """
+    A read-only snapshot of an element built from a UIA cache request.
+    Properties are read from the cache, no cross-process call is made,
+    so they may be stale if the UI changed after the cache was built.
+    Use `CachedControl.Control` to get a live `Control` for the same element.
+    """
+    DefaultPropertyIds = (
+        PropertyId.NameProperty,
+        PropertyId.BoundingRectangleProperty,
+        PropertyId.RuntimeIdProperty,
+        PropertyId.ControlTypeProperty,
+        PropertyId.ClassNameProperty,
+    )
+
+    def __init__(self, element):
+        self.Element = element
+        self.Name = element.CachedName
+        rect = element.CachedBoundingRectangle
+        self.BoundingRectangle = Rect(rect.left, rect.top, rect.right, rect.bottom)
+        self.ControlType = element.CachedControlType
+        self.ClassName = element.CachedClassName
+        runtimeId = element.GetCachedPropertyValue(PropertyId.RuntimeIdProperty)
+        self.RuntimeId = list(runtimeId) if runtimeId else []
+        self.RuntimeKey = tuple(self.RuntimeId)  # hashable RuntimeId, for dict keys and comparison
+        try:
+            children = element.GetCachedChildren()
+        except comtypes.COMError:
+            children = None
+        self._children = CachedControl.FromElementArray(children)
+        self._control = None
+
+    @staticmethod
+    def FromElementArray(elementArray) -> List['CachedControl']:
+        """elementArray: `ctypes.POINTER(IUIAutomationElementArray)` with cached properties."""
+        if not elementArray:
+            return []
+        return [CachedControl(elementArray.GetElement(i)) for i in range(elementArray.Length)]
+
+    def __repr__(self) -> str:
+        return 'CachedControl(ControlType: {0}, ClassName: {1}, Rect: {2}, Name: {3})'.format(
+            self.ControlTypeName, self.ClassName, self.BoundingRectangle, self.Name)
+
+    @property
+    def ControlTypeName(self) -> str:
+        return ControlTypeNames[self.ControlType]
+
+    @property
+    def Control(self) -> 'Control':
+        """Return a live `Control` of the element's real type, created without a cross-process call."""
+        if self._control is None:
+            self._control = ControlConstructors.get(self.ControlType, Control)(element=self.Element)
+        return self._control
+
+    def GetRuntimeId(self) -> List[int]:
+        return self.RuntimeId
+
+    def GetChildren(self) -> List['CachedControl']:
+        return self._children
+
+    def GetDescendants(self) -> List['CachedControl']:
+        """Return all cached descendants in depth-first pre-order, the same order `Control` searching uses."""
+        descendants = []
+        stack = list(reversed(self._children))
+        while stack:
+            item = stack.pop()
+            descendants.append(item)
+            stack.extend(reversed(item._children))
+        return descendants
+
+
 class UIAutomationInitializerInThread:
     def __init__(self, debug: bool = False):
         self.debug = debug
@@ -7555,6 +7708,40 @@ class UIAutomationInitializerInThread:
             print('\ncall UninitializeUIAutomationInCurrentThread in {}'.format(th))
 
 
+def AddStructureChangedEventHandler(control: 'Control', callback: Callable[[int, List[int]], None], scope: int = TreeScope.Element | TreeScope.Children) -> Any:
+    """
+    Subscribe to UIA StructureChanged events of a control.
+    control: `Control`, the control to watch.
+    callback: function(changeType: int, runtimeId: List[int]), changeType is a value in class `StructureChangeType`.
+        It is called on a UIA worker thread, keep it short and do not touch controls in it.
+    scope: int, a value in class `TreeScope`. ChildrenInvalidated, ChildrenBulkAdded and ChildrenReordered are raised
+        with the control itself as the sender, so include `TreeScope.Element` to receive them.
+    Return the handler object, pass it to `RemoveStructureChangedEventHandler` to unsubscribe.
+    """
+    client = _AutomationClient.instance()
+    core = client.UIAutomationCore
+
+    class _StructureChangedEventHandler(comtypes.COMObject):
+        _com_interfaces_ = [core.IUIAutomationStructureChangedEventHandler]
+
+        def IUIAutomationStructureChangedEventHandler_HandleStructureChangedEvent(self, sender, changeType, runtimeId):
+            try:
+                callback(changeType, list(runtimeId) if runtimeId else [])
+            except Exception as ex:
+                Logger.WriteLine('StructureChangedEventHandler callback error: {}'.format(ex), ConsoleColor.Yellow)
+
+    handler = _StructureChangedEventHandler()
+    client.IUIAutomation.AddStructureChangedEventHandler(control.Element, scope, None, handler)
+    return handler
+
+
+def RemoveStructureChangedEventHandler(control: 'Control', handler: Any) -> None:
+    """
+    Unsubscribe a handler returned by `AddStructureChangedEventHandler`.
+    """
+    _AutomationClient.instance().IUIAutomation.RemoveStructureChangedEventHandler(control.Element, handler)
+
+
 def InitializeUIAutomationInCurrentThread() -> None:
     """
     Initialize UIAutomation in a new thread.
@@ -7577,6 +7764,7 @@ def UninitializeUIAutomationInCurrentThread() -> None:
 
 def SetGlobalSearchTimeout(seconds: float) -> None:
     """
+    Set the default search timeout of all threads, threads inside a `SearchTimeout` block are not affected.
     seconds: float.
     To make this available, you need explicitly import uiautomation:
         from uiautomation import uiautomation as auto
@@ -7586,6 +7774,40 @@ def SetGlobalSearchTimeout(seconds: float) -> None:
     TIME_OUT_SECOND = seconds
 
 
+_searchTimeoutLocal = threading.local()
+
+
+def GetSearchTimeout() -> float:
+    """
+    Return float, the search timeout used by `Control.Element` and `Control.Refind` in the current thread:
+    the innermost `SearchTimeout` block of this thread, else the global TIME_OUT_SECOND.
+    """
+    stack = getattr(_searchTimeoutLocal, 'stack', None)
+    return stack[-1] if stack else TIME_OUT_SECOND
+
+
+class SearchTimeout:
+    """
+    Context manager, set the search timeout of the current thread only and restore it on exit, even if an exception raised.
+    Blocks can be nested, other threads keep their own timeout.
+        with auto.SearchTimeout(1):
+            rect = control.BoundingRectangle  # raise LookupError after 1 second if control does not exist
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def __enter__(self) -> 'SearchTimeout':
+        stack = getattr(_searchTimeoutLocal, 'stack', None)
+        if stack is None:
+            stack = _searchTimeoutLocal.stack = []
+        stack.append(self.seconds)
+        return self
+
+    def __exit__(self, exceptionType, exceptionValue, exceptionTraceback):
+        _searchTimeoutLocal.stack.pop()
+
+
 def WaitForExist(control: Control, timeout: float) -> bool:
     """
     Check if control exists in timeout seconds.
@@ -7920,6 +8142,104 @@ def FindControl(control: Control, compare: Callable[[Control, int], bool], maxDe
                 return child
 
 
+class _LocatorCache:
+    """
+    Cache of elements found by `Control.Exists`, keyed by root RuntimeId, searchDepth and searchProperties.
+    A cached element is reused only if it still has a parent and still matches the search properties,
+    which costs a few property reads instead of a `WalkControl` traversal.
+    Validation can not tell whether the element is still the first match, so only locators that identify
+    a single element are cached: foundIndex must be 1 and searchProperties must include AutomationId or Name,
+    or ClassName with searchDepth 1 (e.g. a top-level window such as ImagePreviewWnd found from the desktop).
+    Ordinal lookups (foundIndex > 1), deeper lookups by ControlType/ClassName only and RegexName lookups
+    are always searched again, because adding or removing siblings silently changes which element they refer to.
+    Elements can only be used in the thread they were found in, so every thread has its own cache.
+    Controls searched with a `Compare` function are never cached.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.savedTraverseCount = 0  # sum of traverseCount that cache hits did not need to walk
+
+    def _Entries(self) -> 'collections.OrderedDict':
+        entries = getattr(self._local, 'entries', None)
+        if entries is None:
+            entries = self._local.entries = collections.OrderedDict()
+        return entries
+
+    @staticmethod
+    def Key(control: 'Control') -> tuple:
+        """Return a hashable key of control's locator, or None if it can not be cached."""
+        props = control.searchProperties
+        if 'Compare' in props or control.foundIndex != 1:
+            return None
+        unique = props.get('AutomationId') or props.get('Name') or (props.get('ClassName') and control.searchDepth == 1)
+        if not unique:
+            return None
+        prev = control.searchFromControl
+        try:
+            root = tuple(prev._element.GetRuntimeId()) if prev else ()
+            props = tuple(sorted(props.items()))
+            hash(props)
+        except Exception:
+            return None
+        return (root, control.searchDepth, props)
+
+    def Get(self, key: tuple, control: 'Control'):
+        """Return the cached element if it is still valid, else None."""
+        entries = self._Entries()
+        entry = entries.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        element, traverseCount = entry
+        try:
+            valid = bool(_AutomationClient.instance().ViewWalker.GetParentElement(element))
+            if valid:
+                candidate = Control.CreateControlFromElement(element)
+                valid = candidate is not None and control._CompareFunction(candidate, control.searchProperties.get('Depth', 0))
+        except comtypes.COMError:
+            valid = False
+        if not valid:
+            del entries[key]
+            with self._lock:
+                self.misses += 1
+            return None
+        entries.move_to_end(key)
+        with self._lock:
+            self.hits += 1
+            self.savedTraverseCount += traverseCount
+        return element
+
+    def Put(self, key: tuple, element, traverseCount: int) -> None:
+        entries = self._Entries()
+        entries[key] = (element, traverseCount)
+        entries.move_to_end(key)
+        while len(entries) > LOCATOR_CACHE_SIZE:
+            entries.popitem(last=False)
+
+    def Clear(self) -> None:
+        """Invalidate the cache of the current thread, call it after a window is rebuilt."""
+        self._Entries().clear()
+
+    def Stats(self) -> Dict[str, Any]:
+        """Return dict: hits, misses, hitRate and savedTraverseCount."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hitRate': self.hits / total if total else 0.0,
+                'savedTraverseCount': self.savedTraverseCount,
+            }
+
+
+LocatorCache = _LocatorCache()
+
+
 def ShowDesktop(waitTime: float = 1) -> None:
     """Show Desktop by pressing win + d"""
     SendKeys('{Win}d')
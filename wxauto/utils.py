@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import functools
 from . import uiautomation as uia
+from .pixels import HasRedPixel, BadgeBox
 from PIL import ImageGrab
 import win32clipboard
 import win32process
@@ -49,11 +52,20 @@ def GetVersionByPath(file_path):
     return version
 
 
-def IsRedPixel(uicontrol):
-    rect = uicontrol.BoundingRectangle
-    bbox = (rect.left, rect.top, rect.right, rect.bottom)
+def IsRedPixel(uicontrol, region=None):
+    """控件区域内是否存在偏红像素（新消息红点）
+
+    Args:
+        uicontrol (uiautomation.Control): 要检测的控件
+        region (tuple, optional): 只截取控件内的子区域 (left, top, right, bottom)，取值为 0~1 的比例，
+            例如 (0.5, 0, 1, 0.5) 表示右上角四分之一；默认截取整个控件
+
+    Returns:
+        bool: 存在偏红像素返回 True
+    """
+    bbox = BadgeBox(uicontrol.BoundingRectangle, region)
     img = ImageGrab.grab(bbox=bbox, all_screens=True)
-    return any(p[0] > p[1] and p[0] > p[2] for p in img.getdata())
+    return HasRedPixel(img)
 
 class DROPFILES(ctypes.Structure):
     _fields_ = [
@@ -250,47 +262,117 @@ def ReadClipboardData():
         Dict[str(i)] = filenames
     return Dict
 
-def ParseWeChatTime(time_str):
-    """
-    时间格式转换函数
+_WECHAT_TIME_FULL = re.compile(r'^(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})$')
+_WECHAT_TIME_TODAY = re.compile(r'^(\d{1,2}):(\d{1,2})$')
+_WECHAT_TIME_YESTERDAY = re.compile(r'^昨天 (\d{1,2}):(\d{1,2})$')
+_WECHAT_TIME_WEEKDAY = re.compile(r'^星期([一二三四五六日]) (\d{1,2}):(\d{1,2})$')
+_WECHAT_TIME_DATE = re.compile(r'^(\d{4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{1,2})$')
+_WEEKDAYS = '一二三四五六日'
 
-    Args:
-        time_str: 输入的时间字符串
+def _clock_time(day, hour, minute):
+    """当天的 时:分，超出范围时返回 None（字符串结果与原先一样照常拼接）"""
+    try:
+        return datetime(day.year, day.month, day.day, int(hour), int(minute))
+    except ValueError:
+        return None
 
-    Returns:
-        转换后的时间字符串
+@functools.lru_cache(maxsize=1024)
+def _parse_wechat_time(time_str, today):
+    """按 (时间字符串, 当天日期) 缓存的解析结果，返回 (datetime, 格式化字符串)，无法识别时返回 (None, None)
+
+    “昨天”“星期X”等相对时间依赖当天日期，所以日期也是缓存键的一部分，跨天后自动重新解析
     """
-    
-    match = re.match(r'^(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2})$', time_str)
+    match = _WECHAT_TIME_FULL.match(time_str)
     if match:
         month, day, hour, minute, second = match.groups()
-        current_year = datetime.now().year
-        return datetime(current_year, int(month), int(day), int(hour), int(minute), int(second)).strftime('%Y-%m-%d %H:%M:%S')
-    
-    match = re.match(r'^(\d{1,2}):(\d{1,2})$', time_str)
+        dt = datetime(today.year, int(month), int(day), int(hour), int(minute), int(second))
+        return dt, dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    match = _WECHAT_TIME_TODAY.match(time_str)
     if match:
         hour, minute = match.groups()
-        return datetime.now().strftime('%Y-%m-%d') + f' {hour}:{minute}:00'
+        dt = _clock_time(today, hour, minute)
+        return dt, today.strftime('%Y-%m-%d') + f' {hour}:{minute}:00'
 
-    match = re.match(r'^昨天 (\d{1,2}):(\d{1,2})$', time_str)
+    match = _WECHAT_TIME_YESTERDAY.match(time_str)
     if match:
         hour, minute = match.groups()
-        yesterday = datetime.now() - timedelta(days=1)
-        return yesterday.strftime('%Y-%m-%d') + f' {hour}:{minute}:00'
+        yesterday = today - timedelta(days=1)
+        dt = _clock_time(yesterday, hour, minute)
+        return dt, yesterday.strftime('%Y-%m-%d') + f' {hour}:{minute}:00'
 
-    match = re.match(r'^星期([一二三四五六日]) (\d{1,2}):(\d{1,2})$', time_str)
+    match = _WECHAT_TIME_WEEKDAY.match(time_str)
     if match:
         weekday, hour, minute = match.groups()
-        weekday_num = ['一', '二', '三', '四', '五', '六', '日'].index(weekday)
-        today_weekday = datetime.now().weekday()
-        delta_days = (today_weekday - weekday_num) % 7
-        target_day = datetime.now() - timedelta(days=delta_days)
-        return target_day.strftime('%Y-%m-%d') + f' {hour}:{minute}:00'
+        delta_days = (today.weekday() - _WEEKDAYS.index(weekday)) % 7
+        target_day = today - timedelta(days=delta_days)
+        dt = _clock_time(target_day, hour, minute)
+        return dt, target_day.strftime('%Y-%m-%d') + f' {hour}:{minute}:00'
 
-    match = re.match(r'^(\d{4})年(\d{1,2})月(\d{1,2})日 (\d{1,2}):(\d{1,2})$', time_str)
+    match = _WECHAT_TIME_DATE.match(time_str)
     if match:
-        year, month, day, hour, minute = match.groups()
-        return datetime(*[int(i) for i in [year, month, day, hour, minute]]).strftime('%Y-%m-%d %H:%M:%S')
+        dt = datetime(*[int(i) for i in match.groups()])
+        return dt, dt.strftime('%Y-%m-%d %H:%M:%S')
+    return None, None
+
+def ParseWeChatTime(time_str, as_datetime=False):
+    """
+    时间格式转换函数
+
+    同一窗口中重复出现的时间分隔符只解析一次，结果按 (时间字符串, 当天日期) 缓存
+
+    Args:
+        time_str: 输入的时间字符串
+        as_datetime (bool): 是否返回 datetime 对象，默认返回格式化后的字符串
+
+    Returns:
+        转换后的时间字符串或 datetime 对象，无法识别时返回 None；
+        时分超出范围（如 25:61）时字符串照常返回，datetime 为 None
+    """
+    dt, text = _parse_wechat_time(time_str, datetime.now().date())
+    return dt if as_datetime else text
+
+
+class SeenMessageIndex:
+    """有界的已处理消息ID索引
+
+    按插入顺序保存消息ID，查询和插入均为O(1)；超过容量时淘汰最早的ID。
+    每次 update 传入当前可见窗口的全部ID，可见消息始终保持为最新，不会被淘汰。
+    """
+    def __init__(self, maxlen=500):
+        self.maxlen = maxlen
+        self._ids = OrderedDict()
+
+    def __contains__(self, msgid):
+        return msgid in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __repr__(self):
+        return f"<SeenMessageIndex {len(self._ids)}/{self.maxlen}>"
+
+    def add(self, msgid):
+        if msgid in self._ids:
+            self._ids.move_to_end(msgid)
+        else:
+            self._ids[msgid] = None
+            if len(self._ids) > self.maxlen:
+                self._ids.popitem(last=False)
+
+    def update(self, msgids):
+        msgids = list(msgids)
+        # 容量至少覆盖一个可见窗口
+        if len(msgids) > self.maxlen:
+            self.maxlen = len(msgids)
+        for msgid in msgids:
+            self.add(msgid)
+
+    def clear(self):
+        self._ids.clear()
 
 
 def RollIntoView(win, ele, equal=False):
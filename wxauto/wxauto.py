@@ -5,6 +5,8 @@ from .utils import *
 from .elements import *
 from .errors import *
 from .color import *
+from .events import ListenEventHub
+from .pollers import ChatPollPool
 import time
 import os
 import re
@@ -15,8 +17,11 @@ except:
 
 class WeChat(WeChatBase):
     VERSION: str = '3.9.11.17'
-    lastmsgid: str = None
+    lastmsgid: tuple = None  # 消息ID，即消息控件 RuntimeId 组成的元组
     listen: dict = dict()
+    listen_events: ListenEventHub = None
+    listen_pool: ChatPollPool = None
+    listen_pool_timeout: float = None
     SessionItemList: list = []
 
     def __init__(
@@ -29,6 +34,8 @@ class WeChat(WeChatBase):
         Args:
             language (str, optional): 微信客户端语言版本, 可选: cn简体中文  cn_t繁体中文  en英文, 默认cn, 即简体中文
         """
+        # 窗口重建后旧的控件定位缓存全部失效
+        uia.LocatorCache.Clear()
         self.UiaAPI: uia.WindowControl = uia.WindowControl(ClassName='WeChatMainWndForPC', searchDepth=1)
         set_debug(debug)
         self.language = language
@@ -59,13 +66,16 @@ class WeChat(WeChatBase):
         
         # 初始化聊天列表，以B开头
         self.B_Search = self.SessionBox.EditControl(Name=self._lang('搜索'))
+        self.B_SessionList = self.SessionBox.ListControl()
+        self.sessions = SessionIndex(self.GetSessionAmont)
         
         # 初始化聊天栏，以C开头
         self.C_MsgList = self.ChatBox.ListControl(Name=self._lang('消息'))
         
         self.nickname = self.A_MyIcon.Name
-        msgs_ = self.GetAllMessage()
-        self.usedmsgid = [i[-1] for i in msgs_]
+        # 只记录当前已加载消息的ID，无需逐条解析
+        self.usedmsgid = SeenMessageIndex(WxParam.SEEN_MSGID_LIMIT)
+        self.usedmsgid.update(self._msgids(self._msgitems()))
         print(f'初始化成功，获取到已登录窗口：{self.nickname}')
     
     def _checkversion(self):
@@ -204,36 +214,23 @@ class WeChat(WeChatBase):
     def CheckNewMessage(self):
         """是否有新消息"""
         self._show()
-        return IsRedPixel(self.A_ChatIcon)
+        return IsRedPixel(self.A_ChatIcon, region=WxParam.CHAT_ICON_BADGE_REGION)
     
     def GetNextNewMessage(self, savepic=False, savefile=False, savevoice=False, timeout=10):
         """获取下一个新消息"""
-        msgs_ = self.GetAllMessage()
-        msgids = [i[-1] for i in msgs_]
+        # 消息列表只枚举一次，ID 由同一批子项得到，只解析新增的尾部
+        MsgItems = self._msgitems()
+        msgids = self._msgids(MsgItems)
 
         if not self.usedmsgid:
-            self.usedmsgid = msgids
+            self.usedmsgid.update(msgids)
         
-        newmsgids = [i for i in msgids if i not in self.usedmsgid]
-        oldmsgids = [i for i in self.usedmsgid if i in msgids]
-        if newmsgids and oldmsgids:
-            MsgItems = self.C_MsgList.GetChildren()
-            msgids = [''.join([str(i) for i in i.GetRuntimeId()]) for i in MsgItems]
-            new = []
-            for i in range(len(msgids)-1, -1, -1):
-                if msgids[i] in self.usedmsgid:
-                    new = msgids[i+1:]
-                    break
-            NewMsgItems = [
-                i for i in MsgItems 
-                if ''.join([str(i) for i in i.GetRuntimeId()]) in new
-                and i.ControlTypeName == 'ListItemControl'
-            ]
-            if NewMsgItems:
-                wxlog.debug('获取当前窗口新消息')
-                msgs = self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
-                self.usedmsgid = msgids
-                return {self.CurrentChat(): msgs}
+        NewMsgItems = self._newtail(MsgItems, msgids)
+        if NewMsgItems:
+            wxlog.debug('获取当前窗口新消息')
+            msgs = self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
+            self.usedmsgid.update(msgids)
+            return {self.CurrentChat(): msgs}
 
         if self.CheckNewMessage():
             wxlog.debug('获取其他窗口新消息')
@@ -248,10 +245,12 @@ class WeChat(WeChatBase):
                     break
             for session in sessiondict:
                 self.ChatWith(session)
-                NewMsgItems = self.C_MsgList.GetChildren()[-sessiondict[session]:]
+                MsgItems = self._msgitems()
+                NewMsgItems = MsgItems[-sessiondict[session]:]
                 msgs = self._getmsgs(NewMsgItems, savepic, savefile, savevoice)
-                msgs_ = self.GetAllMessage()
-                self.usedmsgid = [i[-1] for i in msgs_]
+                # 已切换到新的聊天，已记录ID只保留当前窗口
+                self.usedmsgid.clear()
+                self.usedmsgid.update(self._msgids(MsgItems))
                 return {session:msgs}
         else:
             wxlog.debug('没有新消息')
@@ -285,23 +284,12 @@ class WeChat(WeChatBase):
         Returns:
             SessionList (dict): 聊天对象列表，键为聊天对象名，值为新消息条数
         """
-        self.SessionItem = self.SessionBox.ListItemControl()
         if reset:
             self.SessionItemList = []
-        SessionList = {}
-        for i in range(100):
-            if self.SessionItem.BoundingRectangle.width() != 0:
-                try:
-                    name, amount = self.GetSessionAmont(self.SessionItem)
-                except:
-                    break
-                if name not in self.SessionItemList:
-                    self.SessionItemList.append(name)
-                if name not in SessionList:
-                    SessionList[name] = amount
-            self.SessionItem = self.SessionItem.GetNextSiblingControl()
-            if not self.SessionItem:
-                break
+        # 只有 Name 变化的会话项才会重新解析，见 SessionIndex
+        SessionList = self.sessions.refresh(self.B_SessionList)
+        known = set(self.SessionItemList)
+        self.SessionItemList.extend(name for name in SessionList if name not in known)
             
         if newmessage:
             return {i:SessionList[i] for i in SessionList if SessionList[i] > 0}
@@ -336,9 +324,13 @@ class WeChat(WeChatBase):
             chatname ( str ): 匹配值第一个的完整名字
         '''
         self._show()
-        sessiondict = self.GetSessionList(True)
-        if who in list(sessiondict.keys())[:-1]:
-            self.SessionBox.ListItemControl(RegexName=who).Click(simulateMove=False)
+        # 先用已记录的会话控件直接点击，失效时才重新读取聊天列表
+        session = self.sessions.get(who)
+        if session is None:
+            self.GetSessionList(True)
+            session = self.sessions.get(who)
+        if session is not None:
+            session.Click(simulateMove=False)
             return who
         else:
             self.UiaAPI.SendKeys('{Ctrl}f', waitTime=1)
@@ -484,7 +476,7 @@ class WeChat(WeChatBase):
         '''
         if not self.C_MsgList.Exists(0.2):
             return []
-        MsgItems = self.C_MsgList.GetChildren()
+        MsgItems = self._msgitems()
         msgs = self._getmsgs(MsgItems, savepic, savefile=savefile, savevoice=savevoice)
         return msgs
     
@@ -513,14 +505,12 @@ class WeChat(WeChatBase):
     
     def CurrentChat(self):
         '''获取当前聊天对象名'''
-        uia.SetGlobalSearchTimeout(1)
         try:
-            currentname = self.ChatBox.TextControl(searchDepth=15).Name
+            with uia.SearchTimeout(1):
+                currentname = self.ChatBox.TextControl(searchDepth=15).Name
             return currentname
         except:
             return None
-        finally:
-            uia.SetGlobalSearchTimeout(10)
 
     def GetNewFriends(self):
         """获取新的好友申请列表
@@ -561,6 +551,8 @@ class WeChat(WeChatBase):
         self.listen[who].savepic = savepic
         self.listen[who].savefile = savefile
         self.listen[who].savevoice = savevoice
+        if self.listen_events is not None:
+            self.listen_events.watch(self.listen[who])
 
     def GetListenMessage(self, who=None):
         """获取监听对象的新消息
@@ -575,14 +567,88 @@ class WeChat(WeChatBase):
             chat = self.listen[who]
             msg = chat.GetNewMessage(savepic=chat.savepic, savefile=chat.savefile, savevoice=chat.savevoice)
             return msg
+        return self._poll_listen(list(self.listen))
+
+    def _poll_listen(self, whos):
+        """获取指定监听对象的新消息，启用并行轮询时交给 listen_pool"""
+        chats = [self.listen[who] for who in whos if who in self.listen]
+        if self.listen_pool is not None:
+            return self.listen_pool.poll(chats, self.listen_pool_timeout)
         msgs = {}
-        for who in self.listen:
-            chat = self.listen[who]
+        for chat in chats:
             msg = chat.GetNewMessage(savepic=chat.savepic, savefile=chat.savefile, savevoice=chat.savevoice)
             if msg:
                 msgs[chat] = msg
         return msgs
 
+    def EnableParallelListen(self, max_workers=4, timeout=None):
+        """启用多线程并行轮询监听对象
+
+        每个线程初始化自己的 COM 环境，聊天窗口固定分配给同一个线程；
+        单个窗口出错只跳过该窗口，结果仍合并为 {ChatWnd: [消息]}
+
+        Args:
+            max_workers (int): 最大线程数
+            timeout (float, optional): 每轮最长等待秒数，超时的窗口结果留到下一轮
+
+        Returns:
+            ChatPollPool: 轮询线程池
+        """
+        self.DisableParallelListen()
+        self.listen_pool = ChatPollPool(max_workers)
+        self.listen_pool_timeout = timeout
+        return self.listen_pool
+
+    def DisableParallelListen(self):
+        """停用多线程并行轮询"""
+        if self.listen_pool is not None:
+            self.listen_pool.close()
+            self.listen_pool = None
+
+    def EnableListenEvents(self, source=None):
+        """启用事件驱动的新消息检测
+
+        订阅所有监听对象消息列表的 UIA 结构变化事件，之后可用 WaitListenMessage
+        代替定时轮询 GetListenMessage
+
+        Args:
+            source (optional): 事件源，默认使用 UIA StructureChanged 事件，测试时可传入假事件源
+
+        Returns:
+            ListenEventHub: 事件通知中心
+        """
+        self.DisableListenEvents()
+        hub = ListenEventHub(source)
+        for who in self.listen:
+            hub.watch(self.listen[who])
+        self.listen_events = hub
+        return hub
+
+    def DisableListenEvents(self):
+        """停用事件驱动的新消息检测"""
+        if self.listen_events is not None:
+            self.listen_events.close()
+            self.listen_events = None
+
+    def WaitListenMessage(self, timeout=5):
+        """等待并获取监听对象的新消息
+
+        启用事件后阻塞等待消息列表变化，只检查有变化的聊天；超过 timeout 没有事件时
+        兜底轮询一次所有监听对象，防止漏掉事件。未启用事件时等价于 GetListenMessage
+
+        Args:
+            timeout (float): 无事件时的兜底轮询间隔（秒）
+
+        Returns:
+            dict: 与 GetListenMessage 相同，{ChatWnd: [消息]}
+        """
+        if self.listen_events is None:
+            return self.GetListenMessage()
+        dirty = self.listen_events.wait(timeout)
+        if not dirty:
+            return self.GetListenMessage()
+        return self._poll_listen(dirty)
+
     def SwitchToContact(self):
         """切换到通讯录页面"""
         self._show()
@@ -615,23 +681,19 @@ class WeChat(WeChatBase):
         """
         ele = self.ChatBox.PaneControl(searchDepth=7, foundIndex=6).ButtonControl(Name='聊天信息')
         try:
-            uia.SetGlobalSearchTimeout(1)
-            rect = ele.BoundingRectangle
+            with uia.SearchTimeout(1):
+                rect = ele.BoundingRectangle
             Click(rect)
         except:
             return 
-        finally:
-            uia.SetGlobalSearchTimeout(10)
         roominfoWnd = self.UiaAPI.Control(ClassName='SessionChatRoomDetailWnd', searchDepth=1)
         more = roominfoWnd.ButtonControl(Name='查看更多', searchDepth=8)
         try:
-            uia.SetGlobalSearchTimeout(1)
-            rect = more.BoundingRectangle
+            with uia.SearchTimeout(1):
+                rect = more.BoundingRectangle
             Click(rect)
         except:
             pass
-        finally:
-            uia.SetGlobalSearchTimeout(10)
         members = [i.Name for i in roominfoWnd.ListControl(Name='聊天成员').GetChildren()]
         while members[-1] in ['添加', '移出']:
             members = members[:-1]
@@ -669,6 +731,10 @@ class WeChat(WeChatBase):
         """移除监听对象"""
         if who in self.listen:
             del self.listen[who]
+            if self.listen_events is not None:
+                self.listen_events.unwatch(who)
+            if self.listen_pool is not None:
+                self.listen_pool.discard(who)
         else:
             Warnings.lightred(f'未找到监听对象：{who}', stacklevel=2)
 